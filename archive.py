@@ -0,0 +1,137 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import typing
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, text
+
+from ci_demo import app, db, User, UserHints, Workshop
+
+
+class ArchiveReport(typing.NamedTuple):
+    """
+    What an archival run moved out of the database.
+    """
+    users: int
+    hints: int
+    export_bytes: int
+    # The size of the user and user_hints tables (with their indexes) before and after; only known on Postgres
+    size_before: typing.Optional[int]
+    size_after: typing.Optional[int]
+
+    @property
+    def reclaimed_bytes(self) -> typing.Optional[int]:
+        if self.size_before is None or self.size_after is None:
+            return None
+        return self.size_before - self.size_after
+
+
+def get_table_size() -> typing.Optional[int]:
+    """
+    Retrieves the space taken by the user and user_hints tables, including their indexes.
+
+    :return: The size in bytes, or None if the database can't tell.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    return db.session.execute(
+        text("SELECT pg_total_relation_size('\"user\"') + pg_total_relation_size('user_hints')")
+    ).scalar()
+
+
+def vacuum() -> None:
+    """
+    Vacuums the user and user_hints tables, so the space of archived rows is reused (and trailing empty pages are
+    returned to the operating system). Unlike VACUUM FULL, this doesn't lock the tables.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('VACUUM ANALYZE "user", user_hints')
+
+
+def archive_inactive_users(days: int, export_path: str, chunk_size: int = 500) -> ArchiveReport:
+    """
+    Moves users that were not active for the given number of days, and their unlocked hints, to a gzipped JSON lines
+    file. Users are archived in chunks of short transactions, so the tables are never locked for long. Every chunk is
+    locked, written to the export and deleted in the same transaction; the export is appended to, so it can be shared
+    by multiple runs.
+    Password hashes are not exported.
+
+    :param days: The number of days after which a user is inactive.
+    :param export_path: The file to append the archived users to.
+    :param chunk_size: The maximum number of users per transaction.
+    :return: What was archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    size_before = get_table_size()
+    users = hints = 0
+    last_id = 0
+    exported_before = os.path.getsize(export_path) if os.path.exists(export_path) else 0
+
+    with gzip.open(export_path, 'at', encoding='utf-8') as fh:
+        while True:
+            # Walk the primary key instead of skipping rows, so every chunk is a cheap index range scan. The users are
+            # locked until the chunk is committed, so they can't log in or unlock hints while they are archived; a user
+            # that logged in while this waited for the lock no longer matches.
+            chunk = db.session.execute(
+                select(User.id, User.name, User.workshop_step, User.last_active, Workshop.name)
+                .outerjoin(Workshop, User.workshop_id == Workshop.id)
+                .where(User.id > last_id, User.last_active < cutoff)
+                .order_by(User.id)
+                .limit(chunk_size)
+                .with_for_update(of=User)
+            ).all()
+            if not chunk:
+                break
+            user_ids = [row[0] for row in chunk]
+            last_id = user_ids[-1]
+
+            hint_ids = {}
+            for hint_id, user_id in db.session.execute(
+                    select(UserHints.id, UserHints.user_id).where(UserHints.user_id.in_(user_ids))):
+                hint_ids.setdefault(user_id, []).append(hint_id)
+
+            for user_id, name, workshop_step, last_active, workshop_name in chunk:
+                fh.write(json.dumps(dict(
+                    id=user_id, name=name, workshop=workshop_name, workshop_step=workshop_step,
+                    last_active=last_active.isoformat(), hints=sorted(hint_ids.get(user_id, []))
+                )) + "\n")
+            fh.flush()
+
+            # Only the exported (and locked) users and their hints are removed
+            hints += db.session.execute(delete(UserHints).where(UserHints.user_id.in_(user_ids))).rowcount
+            users += db.session.execute(delete(User).where(User.id.in_(user_ids))).rowcount
+            db.session.commit()
+
+    vacuum()
+    return ArchiveReport(
+        users=users, hints=hints, export_bytes=os.path.getsize(export_path) - exported_before,
+        size_before=size_before, size_after=get_table_size()
+    )
+
+
+def main(arguments: typing.List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Archives the users of finished workshops.")
+    parser.add_argument('export', help="The gzipped JSON lines file to append the archived users to.")
+    parser.add_argument('--days', type=int, default=30, help="The number of days after which a user is inactive.")
+    parser.add_argument('--chunk-size', type=int, default=500, help="The maximum number of users per transaction.")
+    args = parser.parse_args(arguments)
+
+    with app.app_context():
+        report = archive_inactive_users(args.days, args.export, args.chunk_size)
+    print("Archived {users} users and {hints} hints ({size} bytes compressed)".format(
+        users=report.users, hints=report.hints, size=report.export_bytes
+    ))
+    if report.reclaimed_bytes is not None:
+        # A plain VACUUM only returns trailing empty pages to the operating system; the rest is reused for new rows
+        print("Reclaimed {reclaimed} bytes (tables went from {before} to {after} bytes)".format(
+            reclaimed=max(report.reclaimed_bytes, 0), before=report.size_before, after=report.size_after
+        ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+"""
+Compares the resident memory of a worker holding a large synthetic hint catalogue, using the slotted hint classes
+against the plain classes they replaced.
+
+Usage: python benchmarks/hint_memory.py [number of hints]
+"""
+import os
+import resource
+import subprocess
+import sys
+
+
+class PlainTextHint:
+    def __init__(self, hint_id: int, text: str) -> None:
+        self.id = hint_id
+        self.type = "text"
+        self.text = text
+
+
+class PlainScreenshotHint:
+    def __init__(self, hint_id: int, image: str, alt: str, caption: str = "") -> None:
+        self.id = hint_id
+        self.type = "screenshot"
+        self.image = image
+        self.alt = alt
+        self.caption = caption
+
+
+class PlainCodeHint:
+    def __init__(self, hint_id: int, code: list) -> None:
+        self.id = hint_id
+        self.type = "code"
+        self.code = code
+
+
+def build_catalogue(variant: str, size: int) -> list:
+    """
+    Builds a synthetic catalogue with an even mix of all hint types.
+
+    :param variant: Either "plain" or "slotted".
+    :param size: The number of hints to create.
+    :return: The hints.
+    """
+    if variant == "plain":
+        text_hint, screenshot_hint, code_hint = PlainTextHint, PlainScreenshotHint, PlainCodeHint
+    else:
+        text_hint, screenshot_hint, code_hint = TextHint, ScreenshotHint, CodeHint
+
+    hints = []
+    for i in range(size):
+        if i % 3 == 0:
+            hints.append(text_hint(i, "Text hint number {i}".format(i=i)))
+        elif i % 3 == 1:
+            hints.append(screenshot_hint(i, "img/{i}.png".format(i=i), "Alt {i}".format(i=i), "Caption {i}".format(i=i)))
+        else:
+            hints.append(code_hint(i, ["line {j} of hint {i}".format(i=i, j=j) for j in range(10)]))
+    return hints
+
+
+def measure(variant: str, size: int) -> int:
+    """
+    Measures the peak resident size of a fresh interpreter after building the catalogue.
+
+    :param variant: Either "plain" or "slotted".
+    :param size: The number of hints to create.
+    :return: The peak resident size in KiB.
+    """
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--child", variant, str(size)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    return int(output)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        sys.path.insert(0, os.getcwd())
+        from hint import TextHint, ScreenshotHint, CodeHint
+        catalogue = build_catalogue(sys.argv[2], int(sys.argv[3]))
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        sys.exit(0)
+
+    hint_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    baseline = measure("none", 0)
+    plain = measure("plain", hint_count) - baseline
+    slotted = measure("slotted", hint_count) - baseline
+    print("Hints:   {count}".format(count=hint_count))
+    print("Plain:   {size} KiB".format(size=plain))
+    print("Slotted: {size} KiB ({ratio:.0%} of plain)".format(size=slotted, ratio=slotted / plain))
@@ -0,0 +1,55 @@
+"""
+Measures the first-request latency of a fresh worker, with a cold and with a warm template bytecode cache. Every
+measurement runs in a new interpreter, like a newly booted gunicorn worker.
+
+Usage: python benchmarks/template_cache.py [number of runs]
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def first_request(cache_dir: str) -> float:
+    """
+    Starts a fresh worker and measures the time it takes to render the workshop goal and all workshop steps.
+
+    :param cache_dir: The template cache directory to use.
+    :return: The elapsed time in milliseconds.
+    """
+    env = dict(os.environ, TEMPLATE_CACHE_DIR=cache_dir, DATABASE_URL='sqlite://')
+    output = subprocess.check_output([sys.executable, __file__, "--child"], cwd=ROOT, env=env)
+    return float(output)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2 and sys.argv[1] == "--child":
+        sys.path.insert(0, ROOT)
+        import flask
+        from ci_demo import app, workshop_steps, WorkshopForm
+
+        start = time.perf_counter()
+        with app.test_request_context('/my_workshop'):
+            app.config['WTF_CSRF_ENABLED'] = False
+            flask.render_template('workshop.html')
+            for step, template in enumerate(workshop_steps, 1):
+                flask.render_template(template, form=WorkshopForm(), current_step=step,
+                                      max_step=len(workshop_steps), hints=[], maxHintsForStep=0)
+        print((time.perf_counter() - start) * 1000)
+        sys.exit(0)
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    cold, warm = [], []
+    for _ in range(runs):
+        cache_dir = tempfile.mkdtemp()
+        cold.append(first_request(cache_dir))
+        warm.append(first_request(cache_dir))
+        shutil.rmtree(cache_dir)
+
+    print("Cold cache: {time:.1f} ms (median of {runs} workers)".format(time=statistics.median(cold), runs=runs))
+    print("Warm cache: {time:.1f} ms (median of {runs} workers)".format(time=statistics.median(warm), runs=runs))
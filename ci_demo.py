@@ -1,37 +1,154 @@
+import atexit
+import functools
 import os
 import random
+import time
 import flask
 import typing
 
+from concurrent.futures import ProcessPoolExecutor
+from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf import FlaskForm
 from functools import wraps
+from jinja2 import FileSystemBytecodeCache
 from passlib.apps import custom_app_context as pwd_context
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Integer, PrimaryKeyConstraint, UniqueConstraint, bindparam, column, func, text, update, values
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import set_committed_value
+from werkzeug.middleware.proxy_fix import ProxyFix
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Length
-from xhtml2pdf import pisa
 
-from hint import Hint, WorkshopHints
+from hint import DEFAULT_CATALOGUE, Hint, WorkshopHints, get_catalogue_names, load_step_templates
+from pdf import get_part_path, merge_pdfs, prune_parts, render_pdf, render_pdf_isolated
+from profiling import RequestProfiler
+from sessions import create_session_interface
+from throttling import LoginThrottle, create_rate_limit_backend
+from write_behind import WriteBehindBuffer
 
 app = flask.Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', '')
 app.config['SECRET_KEY'] = 'foo-bar'
 app.config['CSRF_SESSION_KEY'] = 'foo-bar'
+# Number of processes for CPU heavy work (password hashing, PDF generation). 0 runs the work in the request itself;
+# gunicorn defaults it to 1 with SERVING_MODE=gevent, where that would block every participant of the worker. The
+# sections of a PDF export are rendered in parallel on these processes; without them, one after the other.
+app.config['CPU_WORKERS'] = int(os.getenv('CPU_WORKERS', '0'))
+# Compiled templates are cached on disk, so new workers don't need to parse and compile them again. Jinja invalidates
+# the cache on its own when the source of a template changes.
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR', os.path.join(app.root_path, '__pycache__', 'jinja'))
+os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+# Every part of the PDF export (about, goal, every step, hints) is rendered and cached on its own, so a change to one
+# step only renders that part again.
+app.config['PDF_CACHE_DIR'] = os.getenv('PDF_CACHE_DIR', os.path.join(app.root_path, '__pycache__', 'pdf'))
+os.makedirs(app.config['PDF_CACHE_DIR'], exist_ok=True)
+# PDF sections are rendered in a separate process that is killed when it uses more than PDF_MEMORY_LIMIT MiB, or when
+# the sections of an export together take longer than PDF_TIMEOUT seconds (gunicorn gives workers longer than that).
+# After a failure, no new attempt is made for PDF_FAILURE_BACKOFF seconds.
+app.config['PDF_SUBPROCESS'] = os.getenv('PDF_SUBPROCESS', '1') == '1'
+app.config['PDF_MEMORY_LIMIT'] = int(os.getenv('PDF_MEMORY_LIMIT', '256'))
+app.config['PDF_TIMEOUT'] = float(os.getenv('PDF_TIMEOUT', '60'))
+app.config['PDF_FAILURE_BACKOFF'] = float(os.getenv('PDF_FAILURE_BACKOFF', '300'))
+# Where sessions are kept: "cookie" (signed cookies), "memory" (in the process, so only with a single worker) or "redis"
+# (shared between workers and dynos).
+# Server-side sessions also cache the state of the user, so most requests don't need the database. The cached state is
+# loaded again after USER_CACHE_TTL seconds, as the user may change in another session (or be archived).
+app.config['SESSION_STORE'] = os.getenv('SESSION_STORE', 'cookie')
+app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', '30'))
+app.config['SESSION_STORE_SIZE'] = int(os.getenv('SESSION_STORE_SIZE', '10000'))
+session_interface = create_session_interface(
+    app.config['SESSION_STORE'], app.config['SESSION_STORE_SIZE'], os.getenv('REDIS_URL')
+)
+if session_interface is not None:
+    app.session_interface = session_interface
+# Seconds between batched writes of workshop steps. 0 writes every step change immediately; otherwise the changes of
+# the last interval (or at most STEP_FLUSH_MAX_PENDING changes) are lost if a worker crashes. Every worker buffers its
+# own changes, so with several workers this needs SESSION_STORE=redis, whose session cache carries the latest step.
+app.config['STEP_FLUSH_INTERVAL'] = float(os.getenv('STEP_FLUSH_INTERVAL', '0'))
+app.config['STEP_FLUSH_MAX_PENDING'] = int(os.getenv('STEP_FLUSH_MAX_PENDING', '500'))
+# Login attempts are limited per IP address and per user name, and new accounts per window, before any password is
+# hashed or the database is queried. THROTTLE_BACKEND is "memory" (per process) or "redis" (shared, uses REDIS_URL).
+# All participants at a venue usually share the IP address of its NAT, so the limit per IP address is generous; the
+# limit per name is what stops guessing the password of a participant.
+app.config['THROTTLE_BACKEND'] = os.getenv('THROTTLE_BACKEND', 'memory')
+app.config['THROTTLE_WINDOW'] = float(os.getenv('THROTTLE_WINDOW', '60'))
+app.config['LOGIN_LIMIT_PER_IP'] = int(os.getenv('LOGIN_LIMIT_PER_IP', '300'))
+app.config['LOGIN_LIMIT_PER_NAME'] = int(os.getenv('LOGIN_LIMIT_PER_NAME', '5'))
+app.config['SIGNUP_LIMIT'] = int(os.getenv('SIGNUP_LIMIT', '100'))
+login_throttle = LoginThrottle(
+    create_rate_limit_backend(app.config['THROTTLE_BACKEND'], os.getenv('REDIS_URL')), app.config['THROTTLE_WINDOW'],
+    app.config['LOGIN_LIMIT_PER_IP'], app.config['LOGIN_LIMIT_PER_NAME'], app.config['SIGNUP_LIMIT']
+)
+# The number of proxies in front of the application, so the IP address of the client is known. Defaults to 1 on Heroku
+# (which sets DYNO), where every request passes its router.
+app.config['PROXY_COUNT'] = int(os.getenv('PROXY_COUNT', '1' if 'DYNO' in os.environ else '0'))
+if app.config['PROXY_COUNT'] > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'], x_proto=app.config['PROXY_COUNT'])
+# Requests are only profiled with PROFILING=1, and then only when they carry the token printed by
+# `python profiling.py` in the X-Profile header, or when they are sampled (a PROFILING_SAMPLE_RATE fraction of them).
+# Tokens are signed with PROFILING_SECRET, not with the secret key; without it, the header is ignored.
+app.config['PROFILING'] = os.getenv('PROFILING', '0') == '1'
+app.config['PROFILING_SECRET'] = os.getenv('PROFILING_SECRET')
+app.config['PROFILING_DIR'] = os.getenv('PROFILING_DIR', os.path.join(app.root_path, 'profiles'))
+app.config['PROFILING_MAX_FILES'] = int(os.getenv('PROFILING_MAX_FILES', '100'))
+app.config['PROFILING_SAMPLE_RATE'] = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
 db = SQLAlchemy(app)
+migrate = Migrate(app, db)
+if app.config['PROFILING']:
+    # Registered before the other request hooks, so loading the user is part of the profile
+    RequestProfiler(
+        app.config['PROFILING_DIR'], app.config['PROFILING_MAX_FILES'], app.config['PROFILING_SAMPLE_RATE'],
+        app.config['PROFILING_SECRET']
+    ).init_app(app)
 
-workshop_hints = WorkshopHints()
+cpu_executor = None  # type: typing.Optional[ProcessPoolExecutor]
+# Set once warm_up() prepared this worker
+warmed_up = False
+# Set when warm_up() couldn't reach the database; /readyz then tries again
+warm_up_failed = False
+
+DEFAULT_WORKSHOP = 'ci_workshop'
+
+workshop_hints = WorkshopHints(catalogue=os.getenv('HINT_CATALOGUE', DEFAULT_CATALOGUE))
+
+
+class Workshop(db.Model):
+    """
+    Represents a workshop event. Multiple events can be hosted at the same time, and can share the same content.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(32), unique=True, nullable=False)
+    content = db.Column(db.String(32), default=DEFAULT_WORKSHOP, nullable=False)
+    users = relationship("User", back_populates="workshop")
 
 
 class User(db.Model):
     """
-    Represents a user in the database.
+    Represents a user in the database. A user belongs to a single workshop (or the default one if not set), so the
+    progress of a user is kept per workshop.
     """
+    __table_args__ = (
+        UniqueConstraint('workshop_id', 'name', name='user_workshop_id_name_key'),
+        # NULLs are distinct in a unique constraint, so the names in the default workshop need their own index
+        db.Index('user_name_default_workshop_key', 'name', unique=True,
+                 postgresql_where=text('workshop_id IS NULL'), sqlite_where=text('workshop_id IS NULL')),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(32), unique=True)
+    name = db.Column(db.String(32))
     password = db.Column(db.String(255), nullable=False)
     workshop_step = db.Column(db.Integer, default=1, nullable=False)
+    workshop_id = db.Column(db.Integer, ForeignKey("workshop.id"), nullable=True)
+    # Incremented on every step change, so a late write of an older step (e.g. from the buffer of another worker) is
+    # skipped
+    step_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # Updated on login and step changes (not on every request) by the clock of the database, so inactive users can be
+    # archived
+    last_active = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    workshop = relationship("Workshop", back_populates="users")
     hints = relationship("UserHints", back_populates="user")
 
     def is_password_valid(self, password: str) -> bool:
@@ -41,7 +158,7 @@ class User(db.Model):
         :param password: The password to be validated.
         :return : Validity of password.
         """
-        return pwd_context.verify(password, self.password)
+        return run_cpu_bound(verify_password, password, self.password)
 
     def update_password(self, new_password: str) -> None:
         """
@@ -49,23 +166,171 @@ class User(db.Model):
 
         :param new_password: The new password to be updated
         """
-        self.password = pwd_context.encrypt(new_password, category='admin')
+        self.password = run_cpu_bound(hash_password, new_password)
+
+
+def hash_password(password: str) -> str:
+    """
+    Hashes a password for storage.
+
+    :param password: The password to hash.
+    :return: The hash of the password.
+    """
+    return pwd_context.encrypt(password, category='admin')
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """
+    Checks a password against a stored hash.
+
+    :param password: The password to check.
+    :param password_hash: The stored hash.
+    :return: True if the password matches the hash.
+    """
+    return pwd_context.verify(password, password_hash)
+
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    """
+    Retrieves the pool of processes for CPU heavy work. It is created on first use, so every (forked) web worker gets
+    its own pool.
+
+    :return: The process pool.
+    """
+    global cpu_executor
+    if cpu_executor is None:
+        cpu_executor = ProcessPoolExecutor(max_workers=app.config['CPU_WORKERS'])
+    return cpu_executor
+
+
+def run_cpu_bound(function: typing.Callable, *args) -> typing.Any:
+    """
+    Runs CPU heavy work in a separate process if CPU workers are configured, so that it doesn't block the other requests
+    that are served by the same worker (e.g. when serving with gevent).
+
+    :param function: The function to call. It must be picklable.
+    :param args: The arguments for the function.
+    :return: The result of the function.
+    """
+    if app.config['CPU_WORKERS'] < 1:
+        return function(*args)
+    return get_cpu_executor().submit(function, *args).result()
+
+
+def map_cpu_bound(function: typing.Callable, *iterables: typing.Iterable) -> typing.List[typing.Any]:
+    """
+    Runs CPU heavy work for every item in parallel, if CPU workers are configured.
+
+    :param function: The function to call. It must be picklable.
+    :param iterables: The arguments for the function, one iterable per argument.
+    :return: The results of the function, in order.
+    """
+    if app.config['CPU_WORKERS'] < 1:
+        return list(map(function, *iterables))
+    return list(get_cpu_executor().map(function, *iterables))
 
 
 class UserHints(db.Model):
     """
     Keep track of taken hints by a user.
     """
+    # Leads with the user, so it serves the lookups of the hints of a user
+    __table_args__ = (PrimaryKeyConstraint('user_id', 'id', name='user_hints_pkey'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, ForeignKey("user.id"), primary_key=True)
     user = relationship("User", back_populates="hints")
 
 
+def flush_workshop_steps(steps: typing.Dict[int, typing.Tuple[int, int]]) -> None:
+    """
+    Stores the workshop steps of multiple users at once. Every worker has its own buffer, so a step is only stored if
+    its version is newer than the stored one; a late flush never overwrites a newer step stored by another worker.
+
+    :param steps: The new workshop step per user id, with its version.
+    :return: void.
+    """
+    with app.app_context():
+        table = User.__table__
+        if db.engine.dialect.name == 'postgresql':
+            new_steps = values(
+                column('id', Integer), column('step', Integer), column('version', Integer), name='new_steps'
+            ).data([(user_id, step, version) for user_id, (step, version) in steps.items()])
+            db.session.execute(update(table).where(
+                table.c.id == new_steps.c.id, table.c.step_version < new_steps.c.version
+            ).values(workshop_step=new_steps.c.step, step_version=new_steps.c.version, last_active=func.now()))
+        else:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('user_id'), table.c.step_version < bindparam('version'))
+                .values(workshop_step=bindparam('step'), step_version=bindparam('version'), last_active=func.now()),
+                [dict(user_id=user_id, step=step, version=version) for user_id, (step, version) in steps.items()]
+            )
+        db.session.commit()
+
+
+step_buffer = WriteBehindBuffer(
+    flush_workshop_steps, app.config['STEP_FLUSH_INTERVAL'], app.config['STEP_FLUSH_MAX_PENDING']
+)
+atexit.register(step_buffer.stop)
+
+
+def apply_newer_step(user: User, step: int, version: int) -> User:
+    """
+    Applies a workshop step change that the user doesn't have yet (e.g. one that was not yet written to the database),
+    if it is newer, without marking the user as changed.
+
+    :param user: The user to update.
+    :param step: The workshop step.
+    :param version: The version of the workshop step.
+    :return: The user.
+    """
+    if version > user.step_version:
+        set_committed_value(user, 'workshop_step', step)
+        set_committed_value(user, 'step_version', version)
+    return user
+
+
+def apply_buffered_step(user: User) -> User:
+    """
+    Applies a workshop step change that was not yet written to the database, without marking the user as changed.
+
+    :param user: The user to update.
+    :return: The user.
+    """
+    pending = step_buffer.get(user.id)
+    if pending is not None:
+        apply_newer_step(user, *pending)
+    return user
+
+
+def store_workshop_step(user: User, step: int) -> None:
+    """
+    Stores the new workshop step of a user, either immediately or through the write-behind buffer.
+
+    :param user: The user.
+    :param step: The new workshop step.
+    :return: void.
+    """
+    version = user.step_version + 1
+    if app.config['STEP_FLUSH_INTERVAL'] > 0:
+        step_buffer.put(user.id, (step, version))
+        apply_newer_step(user, step, version)
+    else:
+        user.workshop_step = step
+        user.step_version = version
+        user.last_active = func.now()
+        db.session.commit()
+
+
+# The longest name that can be used to log in
+MAX_NAME_LENGTH = 10
+
+
 class LoginForm(FlaskForm):
     """
     Represents the login form.
     """
-    name = StringField('Name', [DataRequired(), Length(max=10)])
+    name = StringField('Name', [DataRequired(), Length(max=MAX_NAME_LENGTH)])
     password = PasswordField('Password', [DataRequired()])
     submit = SubmitField('Log in')
 
@@ -84,14 +349,35 @@ dashboard_images = [
     'img/welcomeC.jpg'
 ]
 
-workshop_steps = [
-    'workshop_github.html',
-    'workshop_codecov.html',
-    'workshop_heroku.html',
-    'workshop_travis.html',
-    'workshop_overview.html',
-    'workshop_final.html'
-]
+# The steps of the default workshop, from the same catalogue as its hints
+workshop_steps = load_step_templates(os.getenv('HINT_CATALOGUE', DEFAULT_CATALOGUE))
+
+
+class WorkshopContent(typing.NamedTuple):
+    """
+    The steps and hints that make up the content of a workshop.
+    """
+    name: str
+    steps: typing.List[str]
+    hints: WorkshopHints
+
+
+def load_workshop_contents() -> typing.Dict[str, WorkshopContent]:
+    """
+    Loads a content for every catalogue in hints/, each with its own steps and hints. The default workshop uses the
+    configured catalogue.
+
+    :return: The contents by name.
+    """
+    contents = {
+        catalogue: WorkshopContent(catalogue, load_step_templates(catalogue), WorkshopHints(catalogue=catalogue))
+        for catalogue in get_catalogue_names() if catalogue != DEFAULT_WORKSHOP
+    }
+    contents[DEFAULT_WORKSHOP] = WorkshopContent(DEFAULT_WORKSHOP, workshop_steps, workshop_hints)
+    return contents
+
+
+workshop_contents = load_workshop_contents()
 
 
 def login_required(wrapped_method: typing.Callable) -> typing.Callable:
@@ -157,6 +443,31 @@ def retrieve_next_hint(user: User, current_step: int, hints: WorkshopHints) -> t
     return None if len(hints_for_step) == 0 else hints_for_step[0]
 
 
+def take_next_hint(user: User, current_step: int, hints: WorkshopHints) -> typing.Optional[Hint]:
+    """
+    Stores the next hint (if available) for the user and the current step as taken. If another session of the user takes
+    the same hint at the same time, the hint after it is taken instead.
+
+    :param user: The current user, attached to the database session.
+    :param current_step: The current step for the user
+    :param hints: All available hints.
+    :return: The taken hint, or None when there are no hints left.
+    """
+    while True:
+        hint = retrieve_next_hint(user, current_step, hints)
+        if hint is None:
+            return None
+        workshop_step = user.workshop_step
+        db.session.add(UserHints(id=hint.id, user_id=user.id))
+        try:
+            db.session.commit()
+            return hint
+        except IntegrityError:
+            db.session.rollback()
+            # Reloads the hints taken by the other session, but keeps the step, which may still be buffered
+            set_committed_value(user, 'workshop_step', workshop_step)
+
+
 def unlock_all_hints_for_step(current_step: int, user: User, hints: WorkshopHints) -> None:
     """
     Unlocks all hints for a user on a certain step.
@@ -174,6 +485,206 @@ def unlock_all_hints_for_step(current_step: int, user: User, hints: WorkshopHint
     db.session.commit()
 
 
+def get_workshop_content(workshop: typing.Optional[Workshop]) -> WorkshopContent:
+    """
+    Retrieves the content (steps and hints) for a workshop.
+
+    :param workshop: The workshop, or None for the default workshop.
+    :return: The content of the workshop, or the default content if the workshop has no known content.
+    """
+    if workshop is None:
+        return workshop_contents[DEFAULT_WORKSHOP]
+    return workshop_contents.get(workshop.content, workshop_contents[DEFAULT_WORKSHOP])
+
+
+def get_pdf_name(content: WorkshopContent, step: typing.Optional[int] = None) -> str:
+    """
+    Returns the name under which the PDF export of the given workshop content is downloaded.
+
+    :param content: The content of the workshop.
+    :param step: The step to export, or None for the whole workshop.
+    :return: The file name of the PDF.
+    """
+    name = "workshop" if content.name == DEFAULT_WORKSHOP else "workshop_{name}".format(name=content.name)
+    if step is not None:
+        name += "_step{step}".format(step=step)
+    return name + ".pdf"
+
+
+def get_pdf_sections(content: WorkshopContent,
+                     step: typing.Optional[int] = None) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Renders every section of the PDF export to a separate html document.
+
+    :param content: The content of the workshop.
+    :param step: The step to export (with its hints), or None for the whole workshop.
+    :return: The name and html of every section, in order.
+    """
+    def render(note: bool = False, sections: typing.Sequence[str] = (), hints: typing.Sequence[Hint] = ()) -> str:
+        return flask.render_template("single_page_pdf.html", note=note, sections=sections, hints=hints)
+
+    def render_step(number: int) -> str:
+        return get_rendered_block_content(
+            content.steps[number - 1], block="step_content", current_step=number, ignore=True
+        )
+
+    if step is not None:
+        sections = [("step{step}".format(step=step), render(sections=[render_step(step)]))]
+        if content.hints.get_hints_for_step(step):
+            sections.append(("hints{step}".format(step=step), render(hints=content.hints.get_hints_for_step(step))))
+        return sections
+
+    return [
+        ("about", render(note=True, sections=[get_rendered_block_content("about.html")])),
+        ("goal", render(sections=[get_rendered_block_content("workshop.html", ignore=True)]))
+    ] + [
+        ("step{step}".format(step=number), render(sections=[render_step(number)]))
+        for number in range(1, len(content.steps) + 1)
+    ] + [
+        ("hints", render(hints=content.hints.get_all_hints()))
+    ]
+
+
+# The path of the merged PDF export per cache directory, workshop content and step. The templates don't change while the
+# application runs (unless they are reloaded in debug mode), so the sections only have to be rendered to find the path
+# once.
+pdf_paths = {}  # type: typing.Dict[typing.Tuple[str, str, typing.Optional[int]], str]
+
+
+def build_pdf(content: WorkshopContent, step: typing.Optional[int] = None) -> typing.Optional[str]:
+    """
+    Creates the PDF export of a workshop (or a single step of it). The sections that are not cached yet are rendered in
+    parallel, after which all sections are merged. The merged PDF is cached by its sections, so it is built again as
+    soon as one of them changed; older versions of the sections and of the merged PDF are removed. A failure is
+    remembered for a while, so retries don't render the failing sections over and over again.
+
+    :param content: The content of the workshop.
+    :param step: The step to export, or None for the whole workshop.
+    :return: The path of the PDF, or None if it could not be created.
+    """
+    cache_dir = app.config['PDF_CACHE_DIR']
+    key = (cache_dir, content.name, step)
+    if key in pdf_paths and not app.jinja_env.auto_reload and os.path.isfile(pdf_paths[key]):
+        return pdf_paths[key]
+
+    name = os.path.splitext(get_pdf_name(content, step))[0]
+    parts = [
+        (html, get_part_path(cache_dir, "{content}_{name}".format(content=content.name, name=section), html))
+        for section, html in get_pdf_sections(content, step)
+    ]
+    pdf_path = get_part_path(cache_dir, name, "\n".join(path for _, path in parts))
+    if os.path.isfile(pdf_path):
+        pdf_paths[key] = pdf_path
+        return pdf_path
+
+    failure_marker = os.path.join(cache_dir, name + ".failed")
+    if os.path.isfile(failure_marker) and \
+            time.time() - os.path.getmtime(failure_marker) < app.config['PDF_FAILURE_BACKOFF']:
+        return None
+
+    missing = [(html, path) for html, path in parts if not os.path.isfile(path)]
+    # Images are read from disk instead of being fetched from this application
+    if app.config['PDF_SUBPROCESS']:
+        render = functools.partial(
+            render_pdf_isolated, memory_limit=app.config['PDF_MEMORY_LIMIT'], timeout=app.config['PDF_TIMEOUT'],
+            static_folder=app.static_folder, deadline=time.time() + app.config['PDF_TIMEOUT']
+        )
+    else:
+        render = functools.partial(render_pdf, static_folder=app.static_folder)
+    if missing and not all(map_cpu_bound(render, *zip(*missing))):
+        with open(failure_marker, "w"):
+            pass
+        return None
+    for _, path in missing:
+        prune_parts(path)
+
+    if step is None:
+        footer = "Single page export of the CI workshop."
+    else:
+        footer = "Step {step} of the CI workshop.".format(step=step)
+    run_cpu_bound(merge_pdfs, [path for _, path in parts], pdf_path, footer)
+    prune_parts(pdf_path)
+    if os.path.isfile(failure_marker):
+        os.remove(failure_marker)
+    pdf_paths[key] = pdf_path
+    return pdf_path
+
+
+def ensure_pdf_exports() -> bool:
+    """
+    Creates the PDF export of every workshop content that doesn't have an up to date one yet.
+
+    :return: True if all exports exist.
+    """
+    exported = True
+    with app.test_request_context():
+        for content in workshop_contents.values():
+            if build_pdf(content) is None:
+                app.logger.warning("Could not create %s", get_pdf_name(content))
+                exported = False
+    return exported
+
+
+def has_pdf_export(content: WorkshopContent) -> bool:
+    """
+    Checks if a PDF export of a workshop content was created, without rendering its sections to find out if it is up to
+    date.
+
+    :param content: The content of the workshop.
+    :return: True if an export of the content exists.
+    """
+    name = os.path.splitext(get_pdf_name(content))[0]
+    return any(
+        file_name.startswith(name + ".") and file_name.endswith(".pdf") and file_name.count(".") == 2
+        for file_name in os.listdir(app.config['PDF_CACHE_DIR'])
+    )
+
+
+def warm_up() -> bool:
+    """
+    Prepares a worker before it serves participants, so the first of them don't have to wait for it: opens a database
+    connection, compiles the templates, and renders the steps and hint fragments. The PDF exports are created during the
+    build instead (see precompile.py), as rendering them could take longer than gunicorn lets a worker boot; missing
+    ones are only reported. If the database can't be reached, the worker stays not ready.
+
+    :return: True if the worker is warmed up.
+    """
+    global warmed_up, warm_up_failed
+    with app.test_request_context():
+        try:
+            db.session.execute(text('SELECT 1'))
+        except SQLAlchemyError:
+            app.logger.exception("Could not warm up, the database is not reachable")
+            warm_up_failed = True
+            return False
+        finally:
+            db.session.remove()
+        precompile_templates()
+        for content in workshop_contents.values():
+            for step in range(1, len(content.steps) + 1):
+                get_rendered_block_content(content.steps[step - 1], block="step_content", current_step=step, ignore=True)
+                sorted_hints = sorted(content.hints.get_hints_for_step(step), key=lambda h: h.id)
+                for nr, hint in enumerate(sorted_hints, 1):
+                    render_hint(hint, nr)
+            if not has_pdf_export(content):
+                app.logger.warning("There is no PDF export of %s; the first download creates it", content.name)
+    warmed_up = True
+    warm_up_failed = False
+    return True
+
+
+def precompile_templates() -> int:
+    """
+    Compiles all templates, so they are stored in the bytecode cache.
+
+    :return: The number of compiled templates.
+    """
+    templates = app.jinja_env.list_templates()
+    for template in templates:
+        app.jinja_env.get_template(template)
+    return len(templates)
+
+
 def get_rendered_block_content(template: str, block: str = "content", **kwargs) -> str:
     """
     Retrieves a given block from a given template, and renders it into html.
@@ -189,10 +700,133 @@ def get_rendered_block_content(template: str, block: str = "content", **kwargs)
     return ''.join(goal_block(goal_context))
 
 
+@functools.lru_cache(maxsize=None)
+def render_hint(hint: Hint, nr: int) -> typing.Tuple[str, str]:
+    """
+    Renders the tab and the navigation item of a hint. They only depend on the hint, so they are rendered once.
+
+    :param hint: The hint.
+    :param nr: The number of the hint within its step.
+    :return: The html of the tab and of the navigation item.
+    """
+    return (
+        flask.render_template("hint.html", hint=hint, nr=nr),
+        flask.render_template("hint_top.html", hint=hint, nr=nr)
+    )
+
+
+def wants_partial_response() -> bool:
+    """
+    Checks if the client asked for JSON with only the changed parts of a page, instead of the full page.
+
+    :return: True if a partial response is requested.
+    """
+    return flask.request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+
+def uses_server_side_sessions() -> bool:
+    """
+    Checks if sessions are kept on the server, so they can safely cache the state of the user.
+
+    :return: True if a server-side session store is used.
+    """
+    return app.config['SESSION_STORE'] != 'cookie'
+
+
+def cache_user_in_session(user: User, workshop: typing.Optional[Workshop]) -> None:
+    """
+    Stores the state of the user in the session (if sessions are kept on the server), so next requests can skip loading
+    the user from the database.
+
+    :param user: The user to cache.
+    :param workshop: The workshop of the user.
+    :return: void.
+    """
+    if not uses_server_side_sessions():
+        return
+    flask.session['cached_user'] = dict(
+        id=user.id, name=user.name, workshop_step=user.workshop_step, step_version=user.step_version,
+        workshop_id=user.workshop_id,
+        hint_ids=[hint.id for hint in user.hints], verified_at=time.time(),
+        workshop=None if workshop is None else dict(id=workshop.id, name=workshop.name, content=workshop.content)
+    )
+
+
+def restore_cached_user(cached_user: dict) -> typing.Tuple[User, typing.Optional[Workshop]]:
+    """
+    Recreates the user and workshop from the state cached in the session. They are not attached to the database session;
+    use get_persistent_user before making changes to the user.
+
+    :param cached_user: The cached state.
+    :return: The user and the workshop.
+    """
+    user = User(
+        id=cached_user['id'], name=cached_user['name'], workshop_step=cached_user['workshop_step'],
+        step_version=cached_user.get('step_version', 0), workshop_id=cached_user['workshop_id'],
+        hints=[UserHints(id=hint_id) for hint_id in cached_user['hint_ids']]
+    )
+    workshop = None if cached_user['workshop'] is None else Workshop(**cached_user['workshop'])
+    return user, workshop
+
+
+def get_persistent_user() -> User:
+    """
+    Makes sure the current user is loaded from the database, as it could be a copy from the session cache. Redirects to
+    the login page if the user no longer exists.
+
+    :return: The current user, attached to the database session.
+    """
+    if flask.g.user not in db.session:
+        cached_user = flask.g.user
+        user = User.query.filter(User.id == cached_user.id).first()
+        if user is None:
+            forget_user()
+            flask.abort(flask.redirect(flask.url_for('login', next=flask.request.endpoint)))
+        # The step may still be pending in the buffer of another worker, but then the session cache has the latest one
+        flask.g.user = apply_newer_step(apply_buffered_step(user), cached_user.workshop_step, cached_user.step_version)
+    return flask.g.user
+
+
+def forget_user() -> None:
+    """
+    Logs the user out of the session, e.g. because the user no longer exists.
+
+    :return: void.
+    """
+    flask.session.pop('user_id', None)
+    flask.session.pop('cached_user', None)
+    flask.g.user = None
+
+
 @app.before_request
 def before_request() -> None:
+    if flask.request.endpoint in ('healthz', 'readyz', 'metrics'):
+        # Probes must not depend on (or load) the user
+        return
     user_id = flask.session.get('user_id', 0)
-    flask.g.user = User.query.filter(User.id == user_id).first()
+    cached_user = flask.session.get('cached_user', None)
+    if cached_user is not None and cached_user['id'] == user_id and \
+            time.time() - cached_user.get('verified_at', 0) < app.config['USER_CACHE_TTL']:
+        flask.g.user, flask.g.workshop = restore_cached_user(cached_user)
+        apply_buffered_step(flask.g.user)
+    else:
+        # Anonymous requests (like every login attempt) don't need the database
+        flask.g.user = None if not user_id else User.query.filter(User.id == user_id).first()
+        if flask.g.user is not None:
+            apply_buffered_step(flask.g.user)
+            if cached_user is not None and cached_user['id'] == user_id:
+                # The step may still be pending in the buffer of another worker, but then the session cache has the
+                # latest one
+                apply_newer_step(flask.g.user, cached_user['workshop_step'], cached_user.get('step_version', 0))
+            workshop_id = flask.g.user.workshop_id
+        else:
+            if user_id:
+                forget_user()
+            workshop_id = flask.session.get('workshop_id', None)
+        flask.g.workshop = None if workshop_id is None else Workshop.query.filter(Workshop.id == workshop_id).first()
+        if flask.g.user is not None:
+            cache_user_in_session(flask.g.user, flask.g.workshop)
+    flask.g.workshop_content = get_workshop_content(flask.g.workshop)
 
 
 @app.route('/')
@@ -215,19 +849,35 @@ def login() -> flask.Response:
     form = LoginForm()
     redirect_location = flask.request.args.get('next', '')
     if form.validate_on_submit():
-        # Check if user exists
-        user = User.query.filter(User.name == form.name.data).first()
+        # Rejected before the user is looked up and the password is hashed
+        workshop_id = None if flask.g.workshop is None else flask.g.workshop.id
+        name = "{workshop}:{name}".format(workshop=workshop_id, name=form.name.data)
+        if not login_throttle.allow_attempt(flask.request.remote_addr or '', name):
+            flask.flash('Too many login attempts, please try again in a minute', 'error-message')
+            return flask.render_template('login.html', form=form, next=redirect_location), 429
+
+        # Check if user exists within the workshop
+        user = User.query.filter(User.workshop_id == workshop_id, User.name == form.name.data).first()
 
         if user is None:
-            user = User(name=form.name.data)
+            if not login_throttle.allow_signup():
+                flask.flash('Too many new accounts, please try again in a minute', 'error-message')
+                return flask.render_template('login.html', form=form, next=redirect_location), 429
+            user = User(name=form.name.data, workshop_id=workshop_id)
             user.update_password(form.password.data)
             db.session.add(user)
             db.session.commit()
             logged_in = True
         else:
             logged_in = user.is_password_valid(form.password.data)
+            if logged_in:
+                user.last_active = func.now()
+                db.session.commit()
 
         if logged_in:
+            if uses_server_side_sessions():
+                # Prevents session fixation; signed cookie sessions get a new value anyway
+                flask.session.regenerate()
             flask.session['user_id'] = user.id
 
             if len(redirect_location) == 0:
@@ -241,6 +891,24 @@ def login() -> flask.Response:
     return flask.render_template('login.html', form=form, next=redirect_location)
 
 
+@app.route('/join/<name>')
+def join_workshop(name: str) -> flask.Response:
+    """
+    Selects the workshop a participant takes part in, and lets them log in for it.
+
+    :param name: The name of the workshop.
+    :return:
+    """
+    selected_workshop = Workshop.query.filter(Workshop.name == name).first()
+    if selected_workshop is None:
+        flask.abort(404)
+
+    flask.session['workshop_id'] = selected_workshop.id
+    flask.session.pop('user_id', None)
+    flask.session.pop('cached_user', None)
+    return flask.redirect(flask.url_for('login', next='my_workshop'))
+
+
 @app.route('/workshop')
 def workshop() -> flask.Response:
     """
@@ -259,49 +927,105 @@ def my_workshop() -> flask.Response:
 
     :return:
     """
+    content = flask.g.workshop_content
     current_step = flask.g.user.workshop_step
-    max_step = len(workshop_steps)
+    max_step = len(content.steps)
 
     form = WorkshopForm()
     if form.validate_on_submit():
+        # The user is about to change, so it can't be a copy from the session cache
+        current_step = get_persistent_user().workshop_step
+
         # Store new step
         if form.next.data:
-            unlock_all_hints_for_step(current_step, flask.g.user, workshop_hints)
+            unlock_all_hints_for_step(current_step, flask.g.user, content.hints)
             current_step += 1
         else:
             current_step -= 1
 
         current_step = get_valid_step(current_step, max_step)
 
-        flask.g.user.workshop_step = current_step
-        db.session.commit()
+        store_workshop_step(flask.g.user, current_step)
+        cache_user_in_session(flask.g.user, flask.g.workshop)
 
-    return flask.render_template(
-        workshop_steps[current_step - 1], form=form, current_step=current_step, max_step=max_step,
-        hints=get_active_hints(flask.g.user, workshop_hints),
-        maxHintsForStep=len(workshop_hints.get_hints_for_step(current_step))
+    template = content.steps[current_step - 1]
+    context = dict(
+        form=form, current_step=current_step, max_step=max_step,
+        hints=get_active_hints(flask.g.user, content.hints),
+        maxHintsForStep=len(content.hints.get_hints_for_step(current_step))
     )
 
+    if wants_partial_response():
+        # Only render the parts of the page that change between steps
+        return flask.jsonify(
+            content=get_rendered_block_content(template, block="step_content", **context),
+            navigation=get_rendered_block_content("workshop_step.html", block="step_navigation", **context),
+            hints=get_rendered_block_content("workshop_step.html", block="step_hints", **context),
+            current_step=current_step,
+            max_step=max_step,
+            max_hints=context['maxHintsForStep']
+        )
+
+    return flask.render_template(template, **context)
+
 
 @app.route('/my_workshop/hint', methods=['POST'])
 @login_required
 def get_hint() -> flask.Response:
-    current_step = get_valid_step(flask.g.user.workshop_step, len(workshop_steps))
-    hint = retrieve_next_hint(flask.g.user, current_step, workshop_hints)
+    content = flask.g.workshop_content
+    current_step = get_valid_step(flask.g.user.workshop_step, len(content.steps))
+    # The hints in the session cache miss the ones taken in other sessions of the user
+    hint = take_next_hint(get_persistent_user(), current_step, content.hints)
     if hint is not None:
-        sorted_hints = sorted(workshop_hints.get_hints_for_step(current_step), key=lambda h: h.id)
+        sorted_hints = sorted(content.hints.get_hints_for_step(current_step), key=lambda h: h.id)
         nr = sorted_hints.index(hint) + 1
-        user_hint = UserHints(id=hint.id, user_id=flask.g.user.id)
-        db.session.add(user_hint)
-        db.session.commit()
-        return flask.jsonify(
-            content=flask.render_template("hint.html", hint=hint, nr=nr),
-            top=flask.render_template("hint_top.html", hint=hint, nr=nr),
-            last=(len(sorted_hints) == nr)
-        )
+        cache_user_in_session(flask.g.user, flask.g.workshop)
+        hint_content, hint_top = render_hint(hint, nr)
+        return flask.jsonify(content=hint_content, top=hint_top, last=(len(sorted_hints) == nr))
     return flask.jsonify(error="No hints available")
 
 
+@app.route('/healthz')
+def healthz() -> flask.Response:
+    """
+    Tells that the worker is alive, without touching the database.
+
+    :return:
+    """
+    return flask.jsonify(status="ok")
+
+
+@app.route('/readyz')
+def readyz() -> flask.Response:
+    """
+    Tells if the worker is ready to serve participants: the database is reachable and the worker was warmed up. A worker
+    of which the warm up failed (e.g. because the database was down when it started) tries again.
+
+    :return:
+    """
+    try:
+        db.session.execute(text('SELECT 1'))
+        database = True
+    except SQLAlchemyError:
+        app.logger.exception("The database is not reachable")
+        database = False
+    if database and warm_up_failed:
+        warm_up()
+    ready = database and warmed_up
+    return flask.jsonify(status="ready" if ready else "not ready", database=database, warmed_up=warmed_up), \
+        200 if ready else 503
+
+
+@app.route('/metrics')
+def metrics() -> flask.Response:
+    """
+    Shows the counters of this worker.
+
+    :return:
+    """
+    return flask.jsonify(rejected_logins=login_throttle.rejected)
+
+
 @app.route('/about')
 def about() -> flask.Response:
     """
@@ -312,6 +1036,21 @@ def about() -> flask.Response:
     return flask.render_template('about.html')
 
 
+def send_pdf(step: typing.Optional[int] = None) -> flask.Response:
+    """
+    Sends the PDF export of the workshop of the current user, creating it if needed.
+
+    :param step: The step to export, or None for the whole workshop.
+    :return:
+    """
+    content = flask.g.workshop_content
+    pdf_path = build_pdf(content, step)
+    if pdf_path is None:
+        flask.abort(400)
+
+    return flask.send_file(pdf_path, as_attachment=True, download_name=get_pdf_name(content, step), max_age=0)
+
+
 @app.route('/download_pdf')
 def download_pdf() -> flask.Response:
     """
@@ -319,26 +1058,20 @@ def download_pdf() -> flask.Response:
 
     :return:
     """
-    pdf_name = "workshop.pdf"
-    if not os.path.isfile(pdf_name):
-        rendered_template = flask.render_template(
-            "single_page_pdf.html",
-            goal_block=get_rendered_block_content("workshop.html", ignore=True),
-            about_block=get_rendered_block_content("about.html"),
-            steps=[get_rendered_block_content(
-                step,
-                block="step_content",
-                current_step=(workshop_steps.index(step) + 1),
-                ignore=True
-            ) for step in workshop_steps],
-            hints=workshop_hints.get_all_hints()
-        )
-        with open(pdf_name, "w+b") as fh:
-            status = pisa.CreatePDF(rendered_template, dest=fh)
-            if status.err:
-                flask.abort(400)
+    return send_pdf()
+
+
+@app.route('/download_pdf/<int:step>')
+def download_step_pdf(step: int) -> flask.Response:
+    """
+    Triggers the download of a PDF of a single step of the workshop, with its hints.
 
-    return flask.send_file(pdf_name, as_attachment=True, cache_timeout=-1)
+    :param step: The step to export.
+    :return:
+    """
+    if not 1 <= step <= len(flask.g.workshop_content.steps):
+        flask.abort(404)
+    return send_pdf(step)
 
 
 if __name__ == '__main__':
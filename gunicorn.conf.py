@@ -0,0 +1,47 @@
+import os
+
+# The serving mode can be either "sync" (one request per worker at a time, the default) or "gevent", where each
+# worker cooperatively serves many concurrent participants while waiting on the database.
+serving_mode = os.getenv('SERVING_MODE', 'sync')
+
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# Seconds a worker may be busy with one request before it is killed. A request may render a PDF export, which takes at
+# most PDF_TIMEOUT seconds (see ci_demo.py), so this stays above that.
+timeout = int(os.getenv('WORKER_TIMEOUT', str(int(float(os.getenv('PDF_TIMEOUT', '60'))) + 30)))
+
+if serving_mode == 'gevent':
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('WORKER_CONNECTIONS', '500'))
+    # Password hashing and PDF rendering don't yield, so they would block every greenlet of the worker; they run in a
+    # separate process instead (the application reads this when the worker imports it)
+    os.environ.setdefault('CPU_WORKERS', '1')
+
+
+def on_starting(server) -> None:
+    """
+    Refuses configurations that lose state between workers, or that block all participants of a worker.
+    """
+    if serving_mode == 'gevent' and int(os.getenv('CPU_WORKERS', '0')) < 1:
+        raise RuntimeError("SERVING_MODE=gevent needs CPU_WORKERS of at least 1, or CPU-bound work blocks the worker")
+    if os.getenv('SESSION_STORE') == 'memory' and server.cfg.workers > 1:
+        raise RuntimeError("SESSION_STORE=memory keeps sessions per worker; use a single worker or SESSION_STORE=redis")
+    if float(os.getenv('STEP_FLUSH_INTERVAL', '0')) > 0 and server.cfg.workers > 1 \
+            and os.getenv('SESSION_STORE') != 'redis':
+        raise RuntimeError("STEP_FLUSH_INTERVAL buffers steps per worker; use a single worker or SESSION_STORE=redis")
+
+
+def post_fork(server, worker) -> None:
+    """
+    Makes psycopg2 cooperative, so database calls yield to other requests instead of blocking the whole worker.
+    """
+    if serving_mode == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def post_worker_init(worker) -> None:
+    """
+    Warms up the worker before it accepts requests, so the first participants don't pay for it.
+    """
+    from ci_demo import warm_up
+    warm_up()
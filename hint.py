@@ -1,6 +1,10 @@
+import hashlib
 import itertools
-from abc import ABCMeta, abstractmethod
-from typing import List, Optional
+import json
+import os
+import pickle
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
 
 GITHUB = 1
 CODECOV = 2
@@ -8,169 +12,224 @@ TRAVIS = 3
 HEROKU = 4
 PIPELINE = 5
 
+CATALOGUE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hints")
+DEFAULT_CATALOGUE = "ci_workshop"
+
+with open(os.path.abspath(__file__), "rb") as _module:
+    HINT_MODULE_DIGEST = hashlib.sha256(_module.read()).digest()
+
+# Required and optional fields per hint type in a catalogue
+HINT_FIELDS = {
+    "text": (("text",), ()),
+    "screenshot": (("image", "alt"), ("caption",)),
+    "code": (("code",), ())
+}
+
+
+class Hint(ABC):
+    """
+    Immutable base class of all hints. Hints are shared by all requests of a worker, so they are slotted to keep a
+    large catalogue small in memory.
+    """
+    __slots__ = ("id", "type")
 
-class Hint(metaclass=ABCMeta):
     @abstractmethod
     def __init__(self, hint_id: int, type: str) -> None:
-        self.id = hint_id
-        self.type = type
+        object.__setattr__(self, "id", hint_id)
+        object.__setattr__(self, "type", type)
+
+    @abstractmethod
+    def _values(self) -> tuple:
+        """
+        Returns the arguments needed to recreate this hint.
+
+        :return: The constructor arguments of the hint.
+        """
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("Hints are immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Hints are immutable")
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._values()))
+
+    def __reduce__(self) -> tuple:
+        return type(self), self._values()
+
+    def __repr__(self) -> str:
+        return "{name}{values!r}".format(name=type(self).__name__, values=self._values())
 
 
 class TextHint(Hint):
+    __slots__ = ("text",)
+
     def __init__(self, hint_id: int, text: str) -> None:
         super().__init__(hint_id, "text")
-        self.text = text
+        object.__setattr__(self, "text", text)
+
+    def _values(self) -> tuple:
+        return self.id, self.text
 
 
 class ScreenshotHint(Hint):
+    __slots__ = ("image", "alt", "caption")
+
     def __init__(self, hint_id: int, image: str, alt: str, caption: Optional[str] = "") -> None:
         super().__init__(hint_id, "screenshot")
-        self.image = image
-        self.alt = alt
-        self.caption = caption
+        object.__setattr__(self, "image", image)
+        object.__setattr__(self, "alt", alt)
+        object.__setattr__(self, "caption", caption)
+
+    def _values(self) -> tuple:
+        return self.id, self.image, self.alt, self.caption
 
 
 class CodeHint(Hint):
-    def __init__(self, hint_id: int, code: List[str]) -> None:
+    __slots__ = ("code", "code_text")
+
+    def __init__(self, hint_id: int, code: Iterable[str]) -> None:
         super().__init__(hint_id, "code")
-        self.code = code
+        object.__setattr__(self, "code", tuple(code))
+        # Joined once, as templates render the text as is
+        object.__setattr__(self, "code_text", "\n".join(self.code))
+
+    def _values(self) -> tuple:
+        return self.id, self.code
 
 
 class WorkshopHints:
-    def __init__(self, hints: Optional[dict] = None) -> None:
+    def __init__(self, hints: Optional[dict] = None, catalogue: str = DEFAULT_CATALOGUE) -> None:
         if hints:
             self.__hints = hints
         else:
-            self.__hints = {
-                GITHUB: [
-                    TextHint(1, "The Fork button can be found on the top right of the page."),
-                    ScreenshotHint(2, "img/github/fork.png", "Fork me!"),
-                    ScreenshotHint(3, "img/github/forked.png", "Forked", "Once the forking process is complete you are owner of this fork.")
-                ],
-                CODECOV: [
-                    ScreenshotHint(4, "img/codecov/authorize.png", "Allow Codecov access to your GitHub account", "Codecov needs access to your GitHub account in order to work properly."),
-                    ScreenshotHint(5, "img/codecov/app-install.png", "Codecov suggests to install the app", "Codecov will by default suggest to also enable the app for better integration."),
-                    ScreenshotHint(6, "img/codecov/app-install2.png", "Allow the Codecov app access to your GitHub account", "The Codecov app needs access to some features of your GitHub account in order to be able to better integrate.")
-                ],
-                TRAVIS: [
-                    ScreenshotHint(7, "img/heroku/create-new-app.png", "Create New App", "A new app and pipeline are created at the same time."),
-                    ScreenshotHint(8, "img/heroku/connect-app-github.png", "Connect to GitHub", "The app is now linked to the GitHub repository."),
-                    ScreenshotHint(9, "img/heroku/add-postgres.png", "Add free add-on", "Heroku Postgres offers a free data plan which can be used."),
-                    ScreenshotHint(10, "img/heroku/connect-pipeline-github.png", "Connect to GitHub", "Connecting the pipeline to the same GitHub repository as the app will allow us to enable review apps in a later step."),
-                    ScreenshotHint(11, "img/heroku/final-result.png", "Pipeline overview", "The pipeline now should look like this."),
-                    ScreenshotHint(12, "img/heroku/pipeline-overview.png", "Pipeline overview", "Heroku provides a shortcut on how to enable the review apps on their site"),
-                    ScreenshotHint(13, "img/heroku/enable-review-apps.png", "", "Once all settings are filled in (by default you don't need to change anything), you can just have Heroku commit the file to your repository."),
-                    ScreenshotHint(14, "img/heroku/retrieve-api-key.png", "The API key", "This API key is needed to ensure that Travis can deploy to Heroku.")
-                ],
-                HEROKU: [
-                    ScreenshotHint(15, "img/travis/sign-up.png", "Sign up on Travis CI", "The home page lists a nice big green button that wants to be clicked"),
-                    ScreenshotHint(16, "img/travis/authorize.png", "Allow Travis access to your GitHub account", "Travis needs access to your GitHub account in order to work properly."),
-                    ScreenshotHint(17, "img/travis/enable.png", "Flip the switch", "Enabling Travis CI for a repository is as \"easy\" as toggling a switch."),
-                    ScreenshotHint(18, "img/travis/secure-encrypt.png", "Securely encrypted API key", "Using the python tool you get a securely encrypted key that can be worrilessly pasted in the Travis configuration file."),
-                    CodeHint(19, code=[
-                        "sudo: true",
-                        "language: python",
-                        "python:"
-                        "  - 3.6",
-                        "  - nightly",
-                        "",
-                        "env:",
-                        "  - MOZ_HEADLESS=1",
-                        "",
-                        "addons:",
-                        "  firefox: latest",
-                        "",
-                        "install:",
-                        "  - pip install -r requirements/dev.txt",
-                        "",
-                        "before_install:",
-                        "  - wget https://github.com/mozilla/geckodriver/releases/download/v0.24.0/geckodriver-v0.24.0-linux64.tar.gz",
-                        "  - mkdir geckodriver",
-                        "  - tar -xzf geckodriver-v0.24.0-linux64.tar.gz -C geckodriver",
-                        "  - sudo chmod +x $PWD/geckodriver/geckodriver",
-                        "  - export PATH=$PATH:$PWD/geckodriver",
-                        "",
-                        "script:",
-                        "  - nosetests --with-cov --cov-config .coveragerc",
-                        "after_success:",
-                        "  - codecov",
-                        "jobs:",
-                        "  include:",
-                        "    - stage: Deploy",
-                        "      script: skip",
-                        "      deploy:",
-                        "        provider: heroku",
-                        "        api_key:",
-                        "          secure: {insert secret here}",
-                        "        app: {your-app-name-here}",
-                        "        on:",
-                        "          repo: {gh_username}/ci_workshop"
-                    ]),
-                    ScreenshotHint(20, "img/travis/failed-build.png", "Failed build", "Even when you are experienced with software, things sometimes take some trial and error...")
-                ],
-                PIPELINE: [
-                    ScreenshotHint(21, "img/pipeline/badges.png", "This is how it could look"),
-                    TextHint(22, "Most of the time you just need to fill in some parameters for the badge, and shields.io will generate the markdown for you..."),
-                    CodeHint(23, code=[
-                        "# Example of shields for the main repository, you just need to substitute some things here...",
-                        "![](https://img.shields.io/website-up-down-green-red/https/barco-ci-workshop.herokuapp.com.svg?label=Heroku%20instance&style=flat)",
-                        "![](https://img.shields.io/travis/canihavesomecoffee/ci_workshop/master.svg?style=flat)",
-                        "![](https://img.shields.io/github/issues-pr/canihavesomecoffee/ci_workshop.svg?style=flat)",
-                        "![](https://img.shields.io/codecov/c/github/canihavesomecoffee/ci_workshop/travis-test.svg?style=flat)"
-                    ]),
-                    TextHint(24, "If you click 'New pull request' after navigating to the branch, you can compare across forks to open the pull request on your fork"),
-                    ScreenshotHint(25, "img/pipeline/pull_request.png", "Creating a pull request across forks"),
-                    TextHint(26, "For the database model you can also look at the existing models for User and UserHints. A minimalistic Joke model contains a column for an ID and a column for the joke."),
-                    CodeHint(27, code=[
-                        "# Sample implementation for a Joke model. This should go in ci_demo.py",
-                        "class Joke(db.Model):",
-                        "\"\"\"",
-                        "Represents a user in the database.",
-                        "\"\"\"",
-                        "",
-                        "id = db.Column(db.Integer, primary_key=True)",
-                        "joke = db.Column(db.Text())"
-                    ]),
-                    TextHint(28, "You can just create new instances of Hint, add them to the session and commit at the end."),
-                    CodeHint(29, code=[
-                        "# Sample for adding a joke (note: quality not guaranteed)",
-                        "joke = Joke(joke=\"What's orange and sounds like a parrot? A carrot!\")",
-                        "db.session.add(joke)",
-                        "db.session.commit()"
-                    ]),
-                    TextHint(30, "Just take a look at the existing routes ;)"),
-                    CodeHint(31, code=[
-                        "# Sample code for selecting a random joke and passing it to a template",
-                        "@app.route('/random_joke')",
-                        "def random_joke() -> flask.Response:",
-                        "    joke = db.session.query(Joke).order_by(func.rand()).first()",
-                        "    return flask.render_template(\"joke.html\")"
-                    ]),
-                    TextHint(32, "For adding new jokes, you should combine the idea of the login page (submitting a form) with adding a new joke (as you did for populating the table)."),
-                    CodeHint(33, code=[
-                        "# Sample code for creating a new joke",
-                        "class JokeForm(FlaskForm):"
-                        "    joke = TextField('Joke', [DataRequired()])",
-                        "    submit = SubmitField('Store joke')",
-                        "",
-                        "",
-                        "@app.route('/add_joke', methods=['GET', 'POST'])",
-                        "def add_joke() -> flask.Response:",
-                        "    form = JokeForm()",
-                        "    if form.validate_on_submit():",
-                        "        # Store in DB",
-                        "        joke = Joke(joke=form.joke)",
-                        "        db.session.add(joke)",
-                        "        db.session.commit()",
-                        "        flask.flash('Joke saved!', 'success-message')",
-                        "",
-                        "    return flask.render_template('add_joke.html', form=form)",
-                    ])
-                ]
-            }
+            self.__hints = load_catalogue(get_catalogue_path(catalogue))
 
     def get_hints_for_step(self, step: int) -> List[Hint]:
         return self.__hints[step] if step in self.__hints else []
 
     def get_all_hints(self) -> List[Hint]:
         return list(itertools.chain.from_iterable(self.__hints.values()))
+
+
+def get_catalogue_path(catalogue: str) -> str:
+    """
+    Returns the path of the hint catalogue with the given name.
+
+    :param catalogue: The name of the catalogue (e.g. the name of the workshop).
+    :return: The path to the JSON file that holds the catalogue.
+    """
+    return os.path.join(CATALOGUE_DIR, catalogue + ".json")
+
+
+def get_catalogue_names() -> List[str]:
+    """
+    Lists the hint catalogues that are available.
+
+    :return: The names of the catalogues, sorted.
+    """
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(CATALOGUE_DIR) if name.endswith(".json"))
+
+
+def load_step_templates(catalogue: str) -> List[str]:
+    """
+    Loads the templates of the steps of a workshop from its catalogue, in order.
+
+    :param catalogue: The name of the catalogue.
+    :return: The names of the step templates.
+    """
+    with open(get_catalogue_path(catalogue), "rb") as fh:
+        templates = json.loads(fh.read().decode("utf-8")).get("templates")
+    if not templates or not all(isinstance(template, str) for template in templates):
+        raise ValueError("The catalogue {name} needs a list of step templates".format(name=catalogue))
+    return templates
+
+
+def create_hint(data: dict) -> Hint:
+    """
+    Creates a hint from its catalogue representation.
+
+    :param data: The dictionary describing the hint.
+    :return: The hint.
+    """
+    hint_type = data.get("type")
+    if hint_type not in HINT_FIELDS:
+        raise ValueError("Hint {id} has an unknown type: {type}".format(id=data.get("id"), type=hint_type))
+
+    required, optional = HINT_FIELDS[hint_type]
+    missing = [field for field in ("id",) + required if field not in data]
+    if missing:
+        raise ValueError("Hint {id} is missing the fields {fields}".format(id=data.get("id"), fields=missing))
+    unknown = set(data) - {"id", "type"} - set(required) - set(optional)
+    if unknown:
+        raise ValueError("Hint {id} has unknown fields {fields}".format(id=data["id"], fields=sorted(unknown)))
+
+    if hint_type == "text":
+        return TextHint(data["id"], data["text"])
+    if hint_type == "screenshot":
+        return ScreenshotHint(data["id"], data["image"], data["alt"], data.get("caption", ""))
+    return CodeHint(data["id"], data["code"])
+
+
+def parse_catalogue(source: bytes) -> Dict[int, List[Hint]]:
+    """
+    Parses and validates a JSON hint catalogue.
+
+    :param source: The raw contents of the catalogue.
+    :return: The hints, grouped per step.
+    """
+    catalogue = json.loads(source.decode("utf-8"))
+    hints = {}
+    seen_ids = set()
+    for step, step_hints in catalogue["steps"].items():
+        hints[int(step)] = []
+        for data in step_hints:
+            hint = create_hint(data)
+            if hint.id in seen_ids:
+                raise ValueError("Hint {id} is defined more than once".format(id=hint.id))
+            seen_ids.add(hint.id)
+            hints[int(step)].append(hint)
+    return hints
+
+
+def load_catalogue(path: str, cache_dir: Optional[str] = None) -> Dict[int, List[Hint]]:
+    """
+    Loads a hint catalogue. The validated catalogue is cached next to the source file, keyed by the hash of the
+    source, so only the first process after a change needs to parse and validate it.
+
+    :param path: The path to the JSON catalogue.
+    :param cache_dir: The directory to store the compiled catalogue in. Defaults to __pycache__ next to the source.
+    :return: The hints, grouped per step.
+    """
+    with open(path, "rb") as fh:
+        source = fh.read()
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), "__pycache__")
+    # The cache holds pickled hints, so it is also keyed by the code of the hint classes
+    digest = hashlib.sha256(source + HINT_MODULE_DIGEST).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_file = os.path.join(cache_dir, "{name}.{digest}.pickle".format(name=name, digest=digest))
+
+    try:
+        with open(cache_file, "rb") as fh:
+            return pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    hints = parse_catalogue(source)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first, so concurrent workers never read a partially written cache
+        tmp_file = "{file}.{pid}".format(file=cache_file, pid=os.getpid())
+        with open(tmp_file, "wb") as fh:
+            pickle.dump(hints, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # Caching is an optimization only; a read-only file system should not prevent loading the hints
+        pass
+    return hints
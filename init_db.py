@@ -1,4 +1,24 @@
-from ci_demo import db
+import sys
+
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+
+from ci_demo import app, db, DEFAULT_WORKSHOP, Workshop, workshop_contents
 
 if __name__ == '__main__':
-    db.create_all()
+    with app.app_context():
+        tables = inspect(db.engine).get_table_names()
+        if 'user' in tables and 'alembic_version' not in tables:
+            # The database was created with db.create_all() before migrations existed
+            stamp(revision='0002' if 'workshop' in tables else '0001')
+        upgrade()
+
+        # Optionally register a new workshop: python init_db.py <name> [content]
+        content = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_WORKSHOP
+        if content not in workshop_contents:
+            sys.exit("Unknown content {content}, choose one of: {names}".format(
+                content=content, names=", ".join(sorted(workshop_contents))
+            ))
+        if len(sys.argv) > 1 and Workshop.query.filter(Workshop.name == sys.argv[1]).first() is None:
+            db.session.add(Workshop(name=sys.argv[1], content=content))
+            db.session.commit()
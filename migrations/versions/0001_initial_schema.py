@@ -0,0 +1,40 @@
+"""Initial schema, as created by db.create_all() before migrations were introduced
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=32), nullable=True),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('workshop_step', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id', name='user_pkey'),
+        sa.UniqueConstraint('name', name='user_name_key')
+    )
+    op.create_table(
+        'user_hints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='user_hints_user_id_fkey'),
+        sa.PrimaryKeyConstraint('id', 'user_id', name='user_hints_pkey')
+    )
+
+
+def downgrade():
+    op.drop_table('user_hints')
+    op.drop_table('user')
@@ -0,0 +1,58 @@
+"""Add workshops, and make user names unique per workshop
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'workshop',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('content', sa.String(length=32), nullable=False),
+        sa.PrimaryKeyConstraint('id', name='workshop_pkey'),
+        sa.UniqueConstraint('name', name='workshop_name_key')
+    )
+    # A nullable column without a default only changes the catalog, so it doesn't rewrite the table
+    op.add_column('user', sa.Column('workshop_id', sa.Integer(), nullable=True))
+
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('user') as batch_op:
+            batch_op.create_foreign_key('user_workshop_id_fkey', 'workshop', ['workshop_id'], ['id'])
+            batch_op.create_unique_constraint('user_workshop_id_name_key', ['workshop_id', 'name'])
+            batch_op.drop_constraint('user_name_key', type_='unique')
+        return
+
+    # Validating the foreign key separately doesn't block writes to the user table while existing rows are checked. It
+    # runs in its own transaction, as this one holds the lock of adding the constraint until the migration ends.
+    op.execute('ALTER TABLE "user" ADD CONSTRAINT user_workshop_id_fkey FOREIGN KEY (workshop_id) '
+               'REFERENCES workshop (id) NOT VALID')
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE "user" VALIDATE CONSTRAINT user_workshop_id_fkey')
+    # Build the index without locking the table, then promote it to a constraint (which only needs a brief lock)
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS user_workshop_id_name_key')
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY user_workshop_id_name_key ON "user" (workshop_id, name)')
+    op.execute('ALTER TABLE "user" ADD CONSTRAINT user_workshop_id_name_key UNIQUE USING INDEX user_workshop_id_name_key')
+    op.drop_constraint('user_name_key', 'user', type_='unique')
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.create_unique_constraint('user_name_key', ['name'])
+        batch_op.drop_constraint('user_workshop_id_name_key', type_='unique')
+        batch_op.drop_constraint('user_workshop_id_fkey', type_='foreignkey')
+        batch_op.drop_column('workshop_id')
+    op.drop_table('workshop')
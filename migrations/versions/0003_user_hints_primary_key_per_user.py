@@ -0,0 +1,49 @@
+"""Start the primary key of user_hints with the user id
+
+The primary key started with the hint id, so it couldn't be used to look up the hints of a user (or to check the
+foreign key when a user is removed). With its columns swapped it serves those lookups, without a second index.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def set_primary_key(*columns: str) -> None:
+    """
+    Replaces the primary key of user_hints.
+
+    :param columns: The columns of the new primary key, in order.
+    :return: void.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('user_hints', recreate='always') as batch_op:
+            batch_op.create_primary_key('user_hints_pkey', list(columns))
+        return
+
+    # Build the index without locking the table, then swap it in as the primary key (which only needs a brief lock). An
+    # earlier, interrupted attempt can leave an invalid index behind, so that one is removed first.
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS user_hints_pkey_new')
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY user_hints_pkey_new ON user_hints ({columns})'.format(
+            columns=', '.join(columns)
+        ))
+    op.execute('ALTER TABLE user_hints DROP CONSTRAINT user_hints_pkey, '
+               'ADD CONSTRAINT user_hints_pkey PRIMARY KEY USING INDEX user_hints_pkey_new')
+
+
+def upgrade():
+    set_primary_key('user_id', 'id')
+
+
+def downgrade():
+    set_primary_key('id', 'user_id')
@@ -0,0 +1,33 @@
+"""Track when users were last active, so users of finished workshops can be archived
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    column = sa.Column('last_active', sa.DateTime(), server_default=sa.func.now(), nullable=False)
+    if op.get_bind().dialect.name != 'postgresql':
+        # SQLite can't add a column with a non-constant default, so the table is recreated
+        with op.batch_alter_table('user', recreate='always') as batch_op:
+            batch_op.add_column(column)
+        return
+
+    # The default is evaluated once and stored in the catalog (Postgres 11+), so existing rows are not rewritten
+    op.add_column('user', column)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('last_active')
@@ -0,0 +1,34 @@
+"""Make user names unique within the default workshop
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Users without a workshop are not covered by user_workshop_id_name_key, as NULLs never collide
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('user_name_default_workshop_key', 'user', ['name'], unique=True,
+                        sqlite_where=sa.text('workshop_id IS NULL'))
+        return
+
+    # Build the index without blocking writes to the user table
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS user_name_default_workshop_key')
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY user_name_default_workshop_key ON "user" (name) '
+                   'WHERE workshop_id IS NULL')
+
+
+def downgrade():
+    op.drop_index('user_name_default_workshop_key', table_name='user')
@@ -0,0 +1,26 @@
+"""Version the workshop step, so late writes of an older step are skipped
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default, so existing rows are not rewritten (Postgres 11+)
+    op.add_column('user', sa.Column('step_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('step_version')
@@ -0,0 +1,258 @@
+import functools
+import hashlib
+import io
+import logging
+import math
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+from urllib.parse import unquote, urlsplit
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+from xhtml2pdf import pisa
+
+logger = logging.getLogger(__name__)
+
+# Part of the name of every cached part, so parts rendered by an earlier version of the rendering are not reused
+RENDER_VERSION = 2
+
+
+def resolve_static_link(uri: str, rel: str, static_folder: str, static_url_path: str = "/static") -> str:
+    """
+    Maps links to static files (also absolute ones, like http://localhost/static/img/flow.png) to the files on disk, so
+    the PDF doesn't depend on fetching them from a server.
+
+    :param uri: The link in the html.
+    :param rel: The document the link is relative to (unused).
+    :param static_folder: The directory that holds the static files.
+    :param static_url_path: The path under which the static files are served.
+    :return: The path of the file, or the link itself if it doesn't point to a static file.
+    """
+    path = unquote(urlsplit(uri).path)
+    prefix = static_url_path.rstrip("/") + "/"
+    if not path.startswith(prefix):
+        return uri
+    folder = os.path.abspath(static_folder)
+    file_name = os.path.normpath(os.path.join(folder, path[len(prefix):]))
+    if os.path.commonpath([folder, file_name]) != folder:
+        return uri
+    return file_name
+
+
+def render_pdf(html: str, pdf_name: str, static_folder: Optional[str] = None) -> bool:
+    """
+    Converts the given html to a PDF file. The file only appears once it is complete, so a failed or concurrent render
+    never leaves a broken file behind.
+
+    :param html: The html to convert.
+    :param pdf_name: The name of the PDF file to write.
+    :param static_folder: The directory that holds the static files the html links to under /static/.
+    :return: True if the PDF was created without errors.
+    """
+    link_callback = None
+    if static_folder is not None:
+        link_callback = functools.partial(resolve_static_link, static_folder=static_folder)
+    temporary_name = "{name}.{pid}.tmp".format(name=pdf_name, pid=os.getpid())
+    with open(temporary_name, "w+b") as fh:
+        status = pisa.CreatePDF(html, dest=fh, link_callback=link_callback)
+    if status.err:
+        os.remove(temporary_name)
+        return False
+    os.replace(temporary_name, pdf_name)
+    return True
+
+
+def get_rss(pid: int) -> int:
+    """
+    Retrieves the resident memory of a process.
+
+    :param pid: The id of the process.
+    :return: The resident memory in bytes, or 0 if it can't be determined.
+    """
+    try:
+        with open("/proc/{pid}/statm".format(pid=pid)) as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def limit_resources(memory_limit: int, timeout: float) -> None:
+    """
+    Limits the resources of the current process, so a render process stops on its own when it uses too much memory or
+    CPU time, even when the process that watches it is gone (e.g. a worker that was killed by gunicorn).
+
+    :param memory_limit: The maximum resident memory in MiB, or 0 for no limit. The address space of a process is larger
+                         than its resident memory, so that is limited to twice as much.
+    :param timeout: The maximum number of seconds rendering may take, which also bounds its CPU time.
+    """
+    limits = [(resource.RLIMIT_CPU, math.ceil(timeout) + 1)]
+    if memory_limit:
+        limits.append((resource.RLIMIT_AS, memory_limit * 2 * 1024 * 1024))
+    for limit, value in limits:
+        _, hard = resource.getrlimit(limit)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(limit, (value, hard))
+
+
+def render_pdf_isolated(html: str, pdf_name: str, memory_limit: int, timeout: float,
+                        static_folder: Optional[str] = None, deadline: Optional[float] = None) -> bool:
+    """
+    Converts the given html to a PDF file in a separate process, which is killed when it uses too much memory or takes
+    too long. The process also limits its own memory and CPU time, in case this process goes away before it does. The
+    PDF file only exists if rendering succeeded.
+
+    :param html: The html to convert.
+    :param pdf_name: The name of the PDF file to write.
+    :param memory_limit: The maximum resident memory of the process in MiB, or 0 for no limit.
+    :param timeout: The maximum number of seconds rendering may take.
+    :param static_folder: The directory that holds the static files the html links to under /static/.
+    :param deadline: The time (as in time.time()) by which rendering must be done, e.g. shared by the parts of a
+                     document, or None to only apply the timeout.
+    :return: True if the PDF was created without errors.
+    """
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.time())
+        if timeout <= 0:
+            logger.warning("Failed to render %s: no time left before the deadline", pdf_name)
+            return False
+
+    # Unique per call, as threads or greenlets of one process can render the same document at the same time
+    fd, html_name = tempfile.mkstemp(suffix=".html", prefix=os.path.basename(pdf_name) + ".",
+                                     dir=os.path.dirname(os.path.abspath(pdf_name)))
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(html)
+
+    started = time.monotonic()
+    reason = None
+    try:
+        arguments = [sys.executable, os.path.abspath(__file__), html_name, pdf_name, str(memory_limit), str(timeout)]
+        if static_folder is not None:
+            arguments.append(static_folder)
+        process = subprocess.Popen(arguments)
+        while True:
+            # wait4 also reports the peak memory of this particular child
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid != 0:
+                break
+            if time.monotonic() - started > timeout:
+                reason = "took longer than {timeout}s".format(timeout=timeout)
+            elif memory_limit and get_rss(process.pid) > memory_limit * 1024 * 1024:
+                reason = "used more than {limit} MiB".format(limit=memory_limit)
+            if reason is not None:
+                process.kill()
+                _, status, usage = os.wait4(process.pid, 0)
+                # The partial output of render_pdf in the child
+                if os.path.isfile("{name}.{pid}.tmp".format(name=pdf_name, pid=process.pid)):
+                    os.remove("{name}.{pid}.tmp".format(name=pdf_name, pid=process.pid))
+                break
+            time.sleep(0.05)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        os.remove(html_name)
+
+    duration = time.monotonic() - started
+    # ru_maxrss is in KiB on Linux
+    peak_memory = usage.ru_maxrss / 1024
+    if reason is None and process.returncode == 0 and os.path.isfile(pdf_name):
+        logger.info("Rendered %s in %.1fs, peak memory %.0f MiB", pdf_name, duration, peak_memory)
+        return True
+    if reason is None and process.returncode == -signal.SIGXCPU:
+        reason = "took longer than {timeout}s of CPU time".format(timeout=timeout)
+    elif reason is None and memory_limit and peak_memory > memory_limit:
+        # Allocations fail in the process itself once it reaches its own limit
+        reason = "used more than {limit} MiB".format(limit=memory_limit)
+    elif reason is None:
+        reason = "exited with {code}".format(code=process.returncode)
+    logger.warning("Failed to render %s: %s (%.1fs, peak memory %.0f MiB)", pdf_name, reason, duration, peak_memory)
+    return False
+
+
+def get_part_path(cache_dir: str, name: str, html: str) -> str:
+    """
+    Builds the path of the cached PDF of a part of a document. The path changes with the html, so a part is only
+    rendered again when its content changed.
+
+    :param cache_dir: The directory that holds the rendered parts.
+    :param name: The name of the part.
+    :param html: The html of the part.
+    :return: The path of the PDF of the part.
+    """
+    source = "{version}\n{html}".format(version=RENDER_VERSION, html=html)
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, "{name}.{digest}.pdf".format(name=name, digest=digest))
+
+
+def prune_parts(path: str) -> int:
+    """
+    Removes the other cached PDFs of the same part, which were rendered from older html or by an earlier version of the
+    rendering.
+
+    :param path: The path of the current PDF of the part, as built by get_part_path.
+    :return: The number of removed files.
+    """
+    directory, file_name = os.path.split(path)
+    prefix = file_name.rsplit(".", 2)[0] + "."
+    removed = 0
+    for other in os.listdir(directory):
+        if other != file_name and other.startswith(prefix) and other.endswith(".pdf") and other.count(".") == 2:
+            try:
+                os.remove(os.path.join(directory, other))
+                removed += 1
+            except FileNotFoundError:
+                # Removed by another worker at the same time
+                pass
+    return removed
+
+
+def create_footer(text: str, width: float, height: float) -> PdfReader:
+    """
+    Creates a page that only holds a footer, to be laid over a page of a document.
+
+    :param text: The text of the footer.
+    :param width: The width of the page in points.
+    :param height: The height of the page in points.
+    :return: A PDF with the footer page.
+    """
+    buffer = io.BytesIO()
+    footer = canvas.Canvas(buffer, pagesize=(width, height))
+    footer.setFont("Helvetica", 10)
+    footer.drawString(50, 58, text)
+    footer.save()
+    buffer.seek(0)
+    return PdfReader(buffer)
+
+
+def merge_pdfs(parts: List[str], pdf_name: str, footer: str) -> None:
+    """
+    Merges PDF files into a single document, and numbers its pages.
+
+    :param parts: The PDF files to merge, in order.
+    :param pdf_name: The name of the PDF file to write.
+    :param footer: The text of the footer on every page, followed by the page number.
+    """
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(part)
+    page_count = len(writer.pages)
+    for number, page in enumerate(writer.pages, 1):
+        text = "{footer} Page {number} of {count}".format(footer=footer, number=number, count=page_count)
+        page.merge_page(create_footer(text, float(page.mediabox.width), float(page.mediabox.height)).pages[0])
+
+    temporary_name = "{name}.{pid}.tmp".format(name=pdf_name, pid=os.getpid())
+    with open(temporary_name, "wb") as fh:
+        writer.write(fh)
+    os.replace(temporary_name, pdf_name)
+
+
+if __name__ == '__main__':
+    # Used by render_pdf_isolated: pdf.py <html file> <pdf file> <memory limit> <timeout> [static folder]
+    limit_resources(int(sys.argv[3]), float(sys.argv[4]))
+    with open(sys.argv[1], encoding="utf-8") as html_file:
+        sys.exit(0 if render_pdf(html_file.read(), sys.argv[2], sys.argv[5] if len(sys.argv) > 5 else None) else 1)
@@ -0,0 +1,8 @@
+from ci_demo import ensure_pdf_exports, precompile_templates
+
+if __name__ == '__main__':
+    # Importing the app already compiles the hint catalogue; this compiles the templates as well.
+    print("Compiled {count} templates".format(count=precompile_templates()))
+    # The exports end up in the slug, so new dynos don't have to render them
+    if ensure_pdf_exports():
+        print("Created the PDF exports")
@@ -0,0 +1,131 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import flask
+from itsdangerous import BadSignature, TimestampSigner
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+PROFILING_HEADER = "X-Profile"
+PROFILING_SALT = "profiling"
+
+
+def create_profiling_token(secret: str) -> str:
+    """
+    Creates a token that asks for a request to be profiled when it is sent in the X-Profile header.
+
+    :param secret: The profiling secret (PROFILING_SECRET), which is separate from the secret key of the application.
+    :return: The signed token.
+    """
+    return TimestampSigner(secret, salt=PROFILING_SALT).sign("profile").decode("utf-8")
+
+
+def count_query(*args) -> None:
+    """
+    Counts the queries of the request that is being profiled.
+    """
+    if flask.has_app_context() and "profiling_queries" in flask.g:
+        flask.g.profiling_queries += 1
+
+
+class RequestProfiler:
+    """
+    Profiles individual requests with cProfile and writes the results as .prof files (which can be viewed as a flame
+    graph with e.g. snakeviz or flameprof) to a directory that holds at most max_files profiles. A request is profiled
+    if it carries a valid token in the X-Profile header (only when a secret is given), or if it is sampled. Only one
+    request per process is profiled at a time.
+    """
+    def __init__(self, directory: str, max_files: int = 100, sample_rate: float = 0.0,
+                 secret: Optional[str] = None, token_max_age: int = 3600) -> None:
+        self.directory = directory
+        self.max_files = max_files
+        self.sample_rate = sample_rate
+        self.token_max_age = token_max_age
+        self.__signer = None if not secret else TimestampSigner(secret, salt=PROFILING_SALT)
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def init_app(self, app: flask.Flask) -> None:
+        """
+        Starts profiling requests of the given application. Register it before the other request hooks, so their time
+        is included.
+
+        :param app: The application to profile.
+        """
+        app.before_request(self._start)
+        app.after_request(self._stop)
+        app.teardown_request(self._release)
+        if not event.contains(Engine, "before_cursor_execute", count_query):
+            event.listen(Engine, "before_cursor_execute", count_query)
+
+    def should_profile(self, request: flask.Request) -> bool:
+        """
+        Checks if a request should be profiled.
+
+        :param request: The request.
+        :return: True if the request asked to be profiled, or was sampled.
+        """
+        token = request.headers.get(PROFILING_HEADER)
+        if token and self.__signer is not None:
+            try:
+                self.__signer.unsign(token, max_age=self.token_max_age)
+                return True
+            except BadSignature:
+                pass
+        return random.random() < self.sample_rate
+
+    def _start(self) -> None:
+        if not self.should_profile(flask.request) or not self.__lock.acquire(blocking=False):
+            return
+        flask.g.profiling_queries = 0
+        flask.g.profiling_started = time.perf_counter()
+        flask.g.profiler = cProfile.Profile()
+        flask.g.profiler.enable()
+
+    def _stop(self, response: flask.Response) -> flask.Response:
+        profiler = flask.g.pop("profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        duration = (time.perf_counter() - flask.g.profiling_started) * 1000
+        user = flask.g.get("user")
+        name = "{time}_{endpoint}_step{step}_{queries}q_{duration:.0f}ms.prof".format(
+            time=datetime.utcnow().strftime("%Y%m%d-%H%M%S-%f"),
+            endpoint=re.sub(r"[^\w.-]", "_", flask.request.endpoint or "none"),
+            step="-" if user is None else user.workshop_step, queries=flask.g.profiling_queries, duration=duration
+        )
+        profiler.dump_stats(os.path.join(self.directory, name))
+        self._remove_old_profiles()
+        logger.info("Profiled %s %s into %s", flask.request.method, flask.request.path, name)
+        return response
+
+    def _release(self, exception: Optional[BaseException] = None) -> None:
+        if "profiling_started" in flask.g:
+            profiler = flask.g.pop("profiler", None)
+            if profiler is not None:
+                # The request failed before it got a response
+                profiler.disable()
+            del flask.g.profiling_started
+            self.__lock.release()
+
+    def _remove_old_profiles(self) -> None:
+        # The names start with the time of the request
+        profiles = sorted(name for name in os.listdir(self.directory) if name.endswith(".prof"))
+        for name in profiles[:max(0, len(profiles) - self.max_files)]:
+            os.remove(os.path.join(self.directory, name))
+
+
+if __name__ == '__main__':
+    if not os.getenv('PROFILING_SECRET'):
+        raise SystemExit("Set PROFILING_SECRET to the value the application uses")
+    token = create_profiling_token(os.environ['PROFILING_SECRET'])
+    print("{header}: {token}".format(header=PROFILING_HEADER, token=token))
@@ -0,0 +1,178 @@
+import argparse
+import csv
+import random
+import sys
+import typing
+
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert, select
+
+from ci_demo import app, db, get_workshop_content, hash_password, MAX_NAME_LENGTH, User, UserHints, Workshop
+
+
+def read_users(path: str) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Reads the users to create from a CSV file with a name and password column.
+
+    :param path: The path to the CSV file.
+    :return: The name and password of every user, without duplicate names.
+    """
+    users = {}
+    with open(path, newline='') as fh:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            name = (row.get('name') or '').strip()
+            if not name or not row.get('password'):
+                raise ValueError("Every user needs a name and a password (line {line})".format(line=reader.line_num))
+            # Longer names fit in the database, but could never log in
+            if len(name) > MAX_NAME_LENGTH:
+                raise ValueError("The name {name} is longer than {max} characters".format(name=name, max=MAX_NAME_LENGTH))
+            users.setdefault(name, row['password'])
+    return list(users.items())
+
+
+def hash_passwords(passwords: typing.List[str], processes: typing.Optional[int] = None) -> typing.List[str]:
+    """
+    Hashes the given passwords in parallel.
+
+    :param passwords: The passwords to hash.
+    :param processes: The number of processes to use, defaults to the number of CPUs.
+    :return: The hashes, in the same order as the passwords.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // 64)))
+
+
+def get_workshop(name: typing.Optional[str]) -> typing.Optional[Workshop]:
+    """
+    Looks up the workshop to add users to.
+
+    :param name: The name of the workshop, or None for the default workshop.
+    :return: The workshop, or None for the default workshop.
+    """
+    if name is None:
+        return None
+    workshop = Workshop.query.filter(Workshop.name == name).first()
+    if workshop is None:
+        raise ValueError("Unknown workshop: {name}".format(name=name))
+    return workshop
+
+
+def get_existing_names(workshop_id: typing.Optional[int]) -> typing.Set[str]:
+    """
+    Retrieves the names of the users that already exist in a workshop.
+
+    :param workshop_id: The id of the workshop, or None for the default workshop.
+    :return: The names of the users.
+    """
+    return set(db.session.execute(select(User.name).where(User.workshop_id == workshop_id)).scalars())
+
+
+def insert_users(rows: typing.List[dict], batch_size: int) -> typing.Dict[str, int]:
+    """
+    Inserts users in batches of multi-row inserts.
+
+    :param rows: The users to insert.
+    :param batch_size: The number of users per batch.
+    :return: The id of every inserted user, by name.
+    """
+    ids = {}
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        db.session.execute(insert(User.__table__), batch)
+        names = [row['name'] for row in batch]
+        ids.update(db.session.execute(
+            select(User.name, User.id).where(User.workshop_id == batch[0]['workshop_id'], User.name.in_(names))
+        ).all())
+        db.session.commit()
+    return ids
+
+
+def provision_users(path: str, workshop_name: typing.Optional[str] = None, processes: typing.Optional[int] = None,
+                    batch_size: int = 500) -> int:
+    """
+    Creates the users listed in a CSV file, skipping the ones that already exist.
+
+    :param path: The path to the CSV file.
+    :param workshop_name: The workshop to add the users to, or None for the default workshop.
+    :param processes: The number of processes used to hash passwords.
+    :param batch_size: The number of users per insert.
+    :return: The number of created users.
+    """
+    workshop = get_workshop(workshop_name)
+    workshop_id = None if workshop is None else workshop.id
+    existing = get_existing_names(workshop_id)
+    users = [(name, password) for name, password in read_users(path) if name not in existing]
+    hashes = hash_passwords([password for _, password in users], processes)
+    rows = [
+        dict(name=name, password=password_hash, workshop_step=1, workshop_id=workshop_id)
+        for (name, _), password_hash in zip(users, hashes)
+    ]
+    return len(insert_users(rows, batch_size))
+
+
+def seed(user_count: int, workshop_name: typing.Optional[str] = None, prefix: str = 'load',
+         batch_size: int = 500) -> typing.Tuple[int, int]:
+    """
+    Creates synthetic users spread over the workshop steps, with the hints they would have unlocked, to load test the
+    queries of the application. All users get the password "load", so only a single hash is needed.
+
+    :param user_count: The number of users to create.
+    :param workshop_name: The workshop to add the users to, or None for the default workshop.
+    :param prefix: The prefix of the names of the users.
+    :param batch_size: The number of rows per insert.
+    :return: The number of created users and unlocked hints.
+    """
+    workshop = get_workshop(workshop_name)
+    workshop_id = None if workshop is None else workshop.id
+    content = get_workshop_content(workshop)
+    existing = get_existing_names(workshop_id)
+    password_hash = hash_password('load')
+
+    rows = []
+    for i in range(user_count):
+        name = '{prefix}{i}'.format(prefix=prefix, i=i)
+        if name not in existing:
+            step = random.randint(1, len(content.steps))
+            rows.append(dict(name=name, password=password_hash, workshop_step=step, workshop_id=workshop_id))
+    ids = insert_users(rows, batch_size)
+
+    hint_rows = []
+    for row in rows:
+        # Hints of earlier steps are unlocked when moving on, and some hints of the current step were requested
+        for step in range(1, row['workshop_step'] + 1):
+            hints = content.hints.get_hints_for_step(step)
+            if step == row['workshop_step']:
+                hints = hints[:random.randint(0, len(hints))]
+            hint_rows.extend(dict(id=hint.id, user_id=ids[row['name']]) for hint in hints)
+    for start in range(0, len(hint_rows), batch_size):
+        db.session.execute(insert(UserHints.__table__), hint_rows[start:start + batch_size])
+        db.session.commit()
+    return len(ids), len(hint_rows)
+
+
+def main(arguments: typing.List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Creates users in bulk before a workshop starts.")
+    parser.add_argument('--workshop', help="The name of the workshop, defaults to the default workshop.")
+    parser.add_argument('--batch-size', type=int, default=500, help="The number of rows per insert.")
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    users_parser = commands.add_parser('users', help="Create the users listed in a CSV file (name,password).")
+    users_parser.add_argument('csv', help="The CSV file with the users.")
+    users_parser.add_argument('--processes', type=int, help="The number of processes used to hash passwords.")
+    seed_parser = commands.add_parser('seed', help="Create synthetic users and hints for load testing.")
+    seed_parser.add_argument('count', type=int, help="The number of users to create.")
+    seed_parser.add_argument('--prefix', default='load', help="The prefix of the names of the users.")
+    args = parser.parse_args(arguments)
+
+    with app.app_context():
+        if args.command == 'users':
+            created = provision_users(args.csv, args.workshop, args.processes, args.batch_size)
+            print("Created {users} users".format(users=created))
+        else:
+            users, hints = seed(args.count, args.workshop, args.prefix, args.batch_size)
+            print("Created {users} users with {hints} unlocked hints".format(users=users, hints=hints))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
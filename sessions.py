@@ -0,0 +1,186 @@
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+import flask
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+
+class SessionStore(ABC):
+    """
+    Stores serialized sessions by their id.
+    """
+    @abstractmethod
+    def get(self, sid: str) -> Optional[str]:
+        """
+        Retrieves a session.
+
+        :param sid: The id of the session.
+        :return: The serialized session, or None if it does not exist (anymore).
+        """
+
+    @abstractmethod
+    def set(self, sid: str, data: str, lifetime: int) -> None:
+        """
+        Stores a session.
+
+        :param sid: The id of the session.
+        :param data: The serialized session.
+        :param lifetime: The number of seconds after which the session expires.
+        """
+
+    @abstractmethod
+    def delete(self, sid: str) -> None:
+        """
+        Removes a session.
+
+        :param sid: The id of the session.
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Keeps sessions in the memory of the process, evicting the least recently used ones when full. Only suitable when
+    the application runs in a single process: every worker would have its own sessions, so participants would be
+    logged out whenever a request lands on another worker.
+    """
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, sid: str) -> Optional[str]:
+        with self.__lock:
+            entry = self.__entries.get(sid)
+            if entry is None:
+                return None
+            data, expires = entry
+            if expires < time.monotonic():
+                del self.__entries[sid]
+                return None
+            self.__entries.move_to_end(sid)
+            return data
+
+    def set(self, sid: str, data: str, lifetime: int) -> None:
+        with self.__lock:
+            self.__entries[sid] = (data, time.monotonic() + lifetime)
+            self.__entries.move_to_end(sid)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def delete(self, sid: str) -> None:
+        with self.__lock:
+            self.__entries.pop(sid, None)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Keeps sessions in Redis, so they are shared between dynos. Requires the redis package.
+    """
+    def __init__(self, url: str, prefix: str = "session:") -> None:
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid: str) -> Optional[str]:
+        data = self.client.get(self.prefix + sid)
+        return None if data is None else data.decode("utf-8")
+
+    def set(self, sid: str, data: str, lifetime: int) -> None:
+        self.client.setex(self.prefix + sid, lifetime, data)
+
+    def delete(self, sid: str) -> None:
+        self.client.delete(self.prefix + sid)
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """
+    A session of which only the id is stored in the cookie.
+    """
+    def __init__(self, sid: str, initial: Optional[dict] = None, new: bool = False) -> None:
+        def on_update(session) -> None:
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        # The id the session had before it was regenerated, which is removed from the store when the session is saved
+        self.previous_sid = None  # type: Optional[str]
+
+    def regenerate(self) -> None:
+        """
+        Gives the session a new id, keeping its data. Call it when the user logs in, so an id that was known before
+        (e.g. planted by an attacker) can't be used to take over the session.
+        """
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps the session data in a session store instead of a signed cookie.
+    """
+    def __init__(self, store: SessionStore) -> None:
+        self.store = store
+
+    def open_session(self, app: flask.Flask, request: flask.Request) -> ServerSideSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSideSession(sid, session_json_serializer.loads(data))
+        return ServerSideSession(secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app: flask.Flask, session: ServerSideSession, response: flask.Response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified:
+            lifetime = int(app.permanent_session_lifetime.total_seconds())
+            self.store.set(session.sid, session_json_serializer.dumps(dict(session)), lifetime)
+
+        if self.should_set_cookie(app, session):
+            response.set_cookie(
+                name, session.sid, expires=self.get_expiration_time(app, session), domain=domain, path=path,
+                httponly=self.get_cookie_httponly(app), secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+
+def create_session_interface(kind: str, max_entries: int = 10000,
+                             url: Optional[str] = None) -> Optional[ServerSideSessionInterface]:
+    """
+    Creates the session interface for the configured kind of session store.
+
+    :param kind: "cookie" for Flask's signed cookies, "memory" or "redis" for a server-side store.
+    :param max_entries: The maximum number of sessions kept by the memory store.
+    :param url: The URL of the Redis server.
+    :return: A session interface, or None to keep the default cookie sessions.
+    """
+    if kind == "memory":
+        return ServerSideSessionInterface(MemorySessionStore(max_entries))
+    if kind == "redis":
+        return ServerSideSessionInterface(RedisSessionStore(url))
+    if kind == "cookie":
+        return None
+    raise ValueError("Unknown session store: {kind}".format(kind=kind))
@@ -0,0 +1,5 @@
+import os
+
+# Every test process gets its own private in-memory database, so the suite can be sharded across processes (e.g.
+# `nosetests --processes=4`) without the workers stepping on each other.
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
@@ -1,14 +1,30 @@
+import os
+import tempfile
+
+from flask.globals import app_ctx
 from flask.testing import FlaskClient
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 import ci_demo
 from ci_demo import app, db
 from flask_testing import TestCase
 
 
+def get_worker_database_path() -> str:
+    """
+    Builds the path of a temporary database file that is unique for the current test process.
+
+    :return: The path to the database file of this worker.
+    """
+    return os.path.join(tempfile.gettempdir(), 'ci_demo_test_{pid}.sql'.format(pid=os.getpid()))
+
+
 class BaseTestCase(TestCase):
     user_id = 1
     user_name = 'test'
     user_password = 'test'
+    # The schema only needs to be created once per worker process, as every test runs in a rolled back transaction.
+    schema_created = False
 
     def create_app(self):
         """
@@ -21,19 +37,48 @@ class BaseTestCase(TestCase):
 
     def setUp(self):
         """
-        Create the database
+        Create the database (once per worker) and start a transaction that will be rolled back after the test.
         :return:
         """
-        db.create_all()
-        db.session.commit()
+        if not BaseTestCase.schema_created:
+            db.create_all()
+            db.session.commit()
+            BaseTestCase.schema_created = True
+
+        self.engine = db.engine
+        self.connection = self.engine.connect()
+        if self.engine.dialect.name == 'sqlite':
+            # pysqlite handles transactions on its own, which breaks savepoints. Let SQLAlchemy take over instead.
+            self.isolation_level = self.connection.connection.dbapi_connection.isolation_level
+            self.connection.connection.dbapi_connection.isolation_level = None
+        self.transaction = self.connection.begin()
+        if self.engine.dialect.name == 'sqlite':
+            self.connection.exec_driver_sql('BEGIN')
+
+        # Bind the session to the test connection (SQLAlchemy's recipe for joining an external transaction), so commits
+        # in the application only release a savepoint. Sessions stay scoped to the application context.
+        db.session.remove()
+        self.session = db.session
+        db.session = scoped_session(
+            sessionmaker(bind=self.connection, join_transaction_mode='create_savepoint'),
+            scopefunc=lambda: id(app_ctx._get_current_object())
+        )
+
+        # Every test starts without earlier login attempts
+        ci_demo.login_throttle.backend.clear()
 
     def tearDown(self):
         """
-        Drop the database tables and also remove the session
+        Roll back everything the test did and also remove the session
         :return:
         """
         db.session.remove()
-        db.drop_all()
+        db.session = self.session
+        self.transaction.rollback()
+        if self.engine.dialect.name == 'sqlite':
+            # The connection goes back to the pool, so leave it as it was found
+            self.connection.connection.dbapi_connection.isolation_level = self.isolation_level
+        self.connection.close()
 
     @staticmethod
     def create_user() -> ci_demo.User:
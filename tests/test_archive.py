@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from archive import archive_inactive_users
+from ci_demo import User, UserHints, Workshop, db
+from tests.base import BaseTestCase
+
+
+class TestArchive(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.export_path = os.path.join(self.directory.name, 'archive.jsonl.gz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def add_user(self, name: str, days_inactive: int, hint_ids=(), workshop=None) -> User:
+        user = User(name=name, password='hash', workshop_step=2, workshop=workshop,
+                    last_active=datetime.utcnow() - timedelta(days=days_inactive))
+        user.hints = [UserHints(id=hint_id) for hint_id in hint_ids]
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def read_export(self):
+        with gzip.open(self.export_path, 'rt') as fh:
+            return [json.loads(line) for line in fh]
+
+    def test_that_only_inactive_users_are_archived(self):
+        workshop = Workshop(name='past')
+        self.add_user('old', 40, [1, 2], workshop)
+        self.add_user('recent', 2, [1])
+        report = archive_inactive_users(30, self.export_path)
+
+        self.assertEqual(1, report.users)
+        self.assertEqual(2, report.hints)
+        self.assertGreater(report.export_bytes, 0)
+        self.assertListEqual(['recent'], [user.name for user in User.query])
+        self.assertEqual(1, UserHints.query.count())
+        archived, = self.read_export()
+        self.assertEqual('old', archived['name'])
+        self.assertEqual('past', archived['workshop'])
+        self.assertEqual(2, archived['workshop_step'])
+        self.assertListEqual([1, 2], archived['hints'])
+        self.assertNotIn('password', archived)
+
+    def test_that_the_hints_of_kept_users_remain(self):
+        self.add_user('old', 40, [1, 2])
+        self.add_user('recent', 2, [1, 2, 3])
+        report = archive_inactive_users(30, self.export_path, chunk_size=1)
+
+        self.assertEqual(2, report.hints)
+        recent = User.query.filter(User.name == 'recent').one()
+        self.assertListEqual([1, 2, 3], sorted(hint.id for hint in recent.hints))
+        self.assertListEqual(['old'], [user['name'] for user in self.read_export()])
+
+    def test_that_users_are_archived_in_chunks(self):
+        for i in range(7):
+            self.add_user('old{i}'.format(i=i), 40, [i])
+        report = archive_inactive_users(30, self.export_path, chunk_size=3)
+
+        self.assertEqual(7, report.users)
+        self.assertEqual(7, report.hints)
+        self.assertEqual(0, User.query.count())
+        self.assertEqual(7, len(self.read_export()))
+
+    def test_that_runs_append_to_the_export(self):
+        self.add_user('first', 40)
+        archive_inactive_users(30, self.export_path)
+        self.add_user('second', 40)
+        archive_inactive_users(30, self.export_path)
+
+        self.assertListEqual(['first', 'second'], [user['name'] for user in self.read_export()])
+
+    def test_that_nothing_is_archived_without_inactive_users(self):
+        self.add_user('recent', 1)
+        report = archive_inactive_users(30, self.export_path)
+
+        self.assertEqual(0, report.users)
+        self.assertEqual(1, User.query.count())
+        self.assertIsNone(report.reclaimed_bytes)
@@ -1,4 +1,7 @@
 from typing import Optional
+from unittest import mock
+
+import flask
 
 import ci_demo
 from tests import base
@@ -7,6 +10,10 @@ from tests import base
 class TestLoginSubmissions(base.BaseTestCase):
     render_templates = False
 
+    def setUp(self):
+        super().setUp()
+        self.rejected_before = ci_demo.login_throttle.rejected
+
     def create_login_form_data(self, password: Optional[str] = None) -> dict:
         """
         Creates the form data for a login event.
@@ -24,6 +31,29 @@ class TestLoginSubmissions(base.BaseTestCase):
             c.post('/login', data=self.create_login_form_data())
         self.assertEqual(1, len(ci_demo.User.query.all()))
 
+    def test_that_login_attempts_are_throttled_before_hashing(self):
+        self.create_user()
+        with self.app.test_client() as c, mock.patch('ci_demo.verify_password', return_value=False) as m_verify:
+            for _ in range(ci_demo.app.config['LOGIN_LIMIT_PER_NAME']):
+                self.assert200(c.post('/login', data=self.create_login_form_data("wrong")))
+            self.assertStatus(c.post('/login', data=self.create_login_form_data()), 429)
+            self.assertMessageFlashed('Too many login attempts, please try again in a minute', 'error-message')
+            self.assertEqual(ci_demo.app.config['LOGIN_LIMIT_PER_NAME'], m_verify.call_count)
+        self.assertEqual(1, ci_demo.login_throttle.rejected['name'] - self.rejected_before.get('name', 0))
+
+    def test_that_signups_are_throttled(self):
+        with self.app.test_client() as c, mock.patch.object(ci_demo.login_throttle, 'signup_limit', 1):
+            c.post('/login', data={'name': 'first', 'password': 'test', 'submit': True})
+            self.assertStatus(c.post('/login', data={'name': 'second', 'password': 'test', 'submit': True}), 429)
+            self.assertMessageFlashed('Too many new accounts, please try again in a minute', 'error-message')
+        self.assertListEqual(['first'], [user.name for user in ci_demo.User.query.all()])
+
+    def test_that_rejected_logins_are_counted(self):
+        with mock.patch.object(ci_demo.login_throttle, 'ip_limit', 0):
+            self.client.post('/login', data=self.create_login_form_data())
+        rejected = self.client.get('/metrics').json['rejected_logins']
+        self.assertEqual(1, rejected['ip'] - self.rejected_before.get('ip', 0))
+
     def test_that_user_gets_error_message_when_wrong_credentials_entered(self):
         self.create_user()
         self.assertEqual(1, len(ci_demo.User.query.all()))
@@ -36,7 +66,6 @@ class TestLoginSubmissions(base.BaseTestCase):
         self.create_user()
         self.assertEqual(1, len(ci_demo.User.query.all()))
         with self.app.test_client() as c:
-            import flask
             c.post('/login', data=self.create_login_form_data())
             self.assertEqual(flask.session.get('user_id', 0), self.user_id)
         self.assertEqual(1, len(ci_demo.User.query.all()))
@@ -54,6 +83,37 @@ class TestLoginSubmissions(base.BaseTestCase):
             self.assertRedirects(r, '/my_workshop')
 
 
+    def test_that_users_with_the_same_name_are_separate_per_workshop(self):
+        self.create_user()
+        workshop = ci_demo.Workshop(name='foo')
+        ci_demo.db.session.add(workshop)
+        ci_demo.db.session.commit()
+        with self.app.test_client() as c:
+            c.get('/join/foo')
+            c.post('/login', data=self.create_login_form_data("other"))
+            user = ci_demo.User.query.filter(ci_demo.User.id == flask.session.get('user_id', 0)).first()
+            self.assertEqual(workshop.id, user.workshop_id)
+        self.assertEqual(2, len(ci_demo.User.query.all()))
+
+
+class TestJoinWorkshop(base.BaseTestCase):
+    render_templates = False
+
+    def test_that_joining_a_workshop_stores_it_in_the_session(self):
+        workshop = ci_demo.Workshop(name='foo')
+        ci_demo.db.session.add(workshop)
+        ci_demo.db.session.commit()
+        with self.app.test_client() as c:
+            self.create_user_and_store_in_session(c)
+            c.get('/join/foo')
+            self.assertEqual(workshop.id, flask.session.get('workshop_id'))
+            self.assertIsNone(flask.session.get('user_id'))
+
+    def test_that_joining_an_unknown_workshop_returns_a_404(self):
+        with self.app.test_client() as c:
+            self.assert404(c.get('/join/foo'))
+
+
 class TestWorkshopSubmissions(base.BaseTestCase):
     render_templates = False
     form_next = {'next': True}
@@ -90,6 +150,21 @@ class TestWorkshopSubmissions(base.BaseTestCase):
         max_steps = len(ci_demo.workshop_steps)
         self.assert_progress_of_workshop(max_steps, max_steps, self.form_next)
 
+    def test_that_a_partial_response_only_contains_the_changed_parts_of_the_step(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            self.set_workshop_step_for_user(u, 1)
+
+            response = c.post('/my_workshop', data=self.form_next, headers={'Accept': 'application/json'})
+
+            self.assertEqual(2, response.json['current_step'])
+            self.assertEqual(len(ci_demo.workshop_steps), response.json['max_step'])
+            self.assertEqual(len(ci_demo.workshop_hints.get_hints_for_step(2)), response.json['max_hints'])
+            self.assertIn('<h1>2.', response.json['content'])
+            self.assertNotIn('<html', response.json['content'])
+            self.assertIn('name="previous"', response.json['navigation'])
+            self.assertIn('hint-btn', response.json['hints'])
+
 
 class TestRequestHintSubmissions(base.BaseTestCase):
     render_templates = False
@@ -1,9 +1,12 @@
+import os
+
 import requests
 from flask_testing import LiveServerTestCase
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 
 from ci_demo import app, db
+from tests.base import get_worker_database_path
 
 
 class BaseSelenium(LiveServerTestCase):
@@ -11,18 +14,30 @@ class BaseSelenium(LiveServerTestCase):
         """
         Create an instance of the app with the testing configuration
         """
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test_db.sql'
+        # Every worker gets its own database file, as the live server runs in a separate process
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + get_worker_database_path()
         app.config['TESTING'] = True
         app.config['DEBUG'] = True
-        # Default port is 5000
-        app.config['LIVESERVER_PORT'] = 8888
+        # Default port is 5000, 0 lets the OS pick a free port so workers can run in parallel
+        app.config['LIVESERVER_PORT'] = 0
         # Default timeout is 5 seconds
         app.config['LIVESERVER_TIMEOUT'] = 10
         return app
 
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Remove the database file of this worker
+        :return:
+        """
+        try:
+            os.remove(get_worker_database_path())
+        except FileNotFoundError:
+            pass
+
     def setUp(self):
         """
-        Create the database
+        Create the database (a no-op if the tables of this worker already exist)
         :return:
         """
         db.create_all()
@@ -38,11 +53,10 @@ class BaseSelenium(LiveServerTestCase):
 
     def tearDown(self):
         """
-        Drop the database tables and also remove the session
+        Remove the session
         :return:
         """
         db.session.remove()
-        db.drop_all()
 
     def test_server_is_up_and_running(self):
         response = requests.get(self.get_server_url())
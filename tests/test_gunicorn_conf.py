@@ -0,0 +1,60 @@
+import importlib.util
+import os
+import runpy
+from unittest import mock, skipUnless, TestCase
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+def load_config(**environment) -> dict:
+    """
+    Loads the gunicorn configuration with the given environment variables.
+
+    :param environment: The environment variables to set.
+    :return: The settings and hooks of the configuration.
+    """
+    with mock.patch.dict(os.environ, environment):
+        config = runpy.run_path(CONFIG_PATH)
+        config['environment'] = dict(os.environ)
+    return config
+
+
+class TestGunicornConfig(TestCase):
+    def setUp(self):
+        self.environment_patch = mock.patch.dict(os.environ)
+        self.environment_patch.start()
+        for name in ('SERVING_MODE', 'CPU_WORKERS', 'SESSION_STORE', 'STEP_FLUSH_INTERVAL', 'PDF_TIMEOUT',
+                     'WORKER_TIMEOUT'):
+            os.environ.pop(name, None)
+
+    def tearDown(self):
+        self.environment_patch.stop()
+
+    def test_that_gevent_mode_runs_cpu_bound_work_in_a_separate_process(self):
+        config = load_config(SERVING_MODE='gevent')
+        self.assertEqual('gevent', config['worker_class'])
+        self.assertEqual('1', config['environment']['CPU_WORKERS'])
+
+    def test_that_gevent_mode_without_cpu_workers_is_refused(self):
+        config = load_config(SERVING_MODE='gevent', CPU_WORKERS='0')
+        with mock.patch.dict(os.environ, {'SERVING_MODE': 'gevent', 'CPU_WORKERS': '0'}), \
+                self.assertRaises(RuntimeError):
+            config['on_starting'](mock.Mock(cfg=mock.Mock(workers=2)))
+
+    def test_that_sync_mode_keeps_the_work_in_the_request(self):
+        config = load_config()
+        self.assertNotIn('worker_class', config)
+        self.assertNotIn('CPU_WORKERS', config['environment'])
+        config['on_starting'](mock.Mock(cfg=mock.Mock(workers=2)))
+
+    def test_that_workers_are_given_longer_than_a_pdf_export(self):
+        self.assertGreater(load_config(PDF_TIMEOUT='100')['timeout'], 100)
+
+    @skipUnless(importlib.util.find_spec('gevent') and importlib.util.find_spec('psycogreen'),
+                "gevent and psycogreen are only installed in production")
+    def test_that_gevent_workers_make_psycopg2_cooperative(self):
+        import gevent.worker  # noqa: F401
+        config = load_config(SERVING_MODE='gevent')
+        with mock.patch('psycogreen.gevent.patch_psycopg') as m_patch:
+            config['post_fork'](mock.Mock(), mock.Mock())
+        m_patch.assert_called_once()
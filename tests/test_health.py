@@ -0,0 +1,93 @@
+import os
+import tempfile
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+import ci_demo
+from ci_demo import db
+from tests.base import BaseTestCase
+
+
+class TestHealth(BaseTestCase):
+    def tearDown(self):
+        ci_demo.warmed_up = False
+        ci_demo.warm_up_failed = False
+        super().tearDown()
+
+    def test_that_healthz_does_not_query_the_database(self):
+        user = self.create_user()
+        # Load the (expired) user before counting
+        self.assertEqual(self.user_id, user.id)
+        queries = []
+
+        def count(*args):
+            queries.append(args)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            with self.app.test_client() as c:
+                self.store_user_id_in_session(c, user)
+                response = c.get('/healthz')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        self.assert200(response)
+        self.assertListEqual([], queries)
+
+    def test_that_readyz_is_not_ready_before_the_warm_up(self):
+        response = self.client.get('/readyz')
+        self.assertStatus(response, 503)
+        self.assertEqual(dict(status="not ready", database=True, warmed_up=False), response.json)
+
+    def test_that_readyz_is_ready_after_the_warm_up(self):
+        with mock.patch('ci_demo.ensure_pdf_exports') as m_pdf:
+            self.assertTrue(ci_demo.warm_up())
+        # The exports are created during the build
+        m_pdf.assert_not_called()
+        self.assert200(self.client.get('/readyz'))
+
+    def test_that_the_warm_up_reports_missing_pdf_exports(self):
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(self.app.config, PDF_CACHE_DIR=cache_dir), \
+                mock.patch('ci_demo.build_pdf') as m_build:
+            with self.assertLogs(self.app.logger, 'WARNING') as logs:
+                self.assertTrue(ci_demo.warm_up())
+            self.assertEqual(len(ci_demo.workshop_contents), len(logs.output))
+
+            for content in ci_demo.workshop_contents.values():
+                name = os.path.splitext(ci_demo.get_pdf_name(content))[0]
+                with open(os.path.join(cache_dir, name + ".0123456789abcdef.pdf"), "w"):
+                    pass
+            with mock.patch.object(self.app.logger, 'warning') as m_warning:
+                self.assertTrue(ci_demo.warm_up())
+            m_warning.assert_not_called()
+        m_build.assert_not_called()
+
+    def test_that_a_warm_up_without_database_leaves_the_worker_not_ready(self):
+        with mock.patch.object(db.session, 'execute', side_effect=OperationalError("SELECT 1", {}, Exception())):
+            self.assertFalse(ci_demo.warm_up())
+        self.assertFalse(ci_demo.warmed_up)
+        # Once the database is back, the readiness check warms up the worker
+        self.assert200(self.client.get('/readyz'))
+
+    def test_that_readyz_is_not_ready_without_database(self):
+        ci_demo.warmed_up = True
+        with mock.patch.object(db.session, 'execute', side_effect=OperationalError("SELECT 1", {}, Exception())):
+            response = self.client.get('/readyz')
+        self.assertStatus(response, 503)
+        self.assertFalse(response.json['database'])
+
+    def test_that_the_warm_up_renders_every_hint(self):
+        ci_demo.render_hint.cache_clear()
+        ci_demo.warm_up()
+        self.assertEqual(len(ci_demo.workshop_hints.get_all_hints()), ci_demo.render_hint.cache_info().currsize)
+        self.assertTrue(ci_demo.warmed_up)
+
+    def test_that_ensure_pdf_exports_builds_every_content(self):
+        with mock.patch('ci_demo.build_pdf', return_value='workshop.pdf') as m_build:
+            self.assertTrue(ci_demo.ensure_pdf_exports())
+        self.assertEqual(len(ci_demo.workshop_contents), m_build.call_count)
+
+    def test_that_ensure_pdf_exports_reports_a_failed_export(self):
+        with mock.patch('ci_demo.build_pdf', return_value=None):
+            self.assertFalse(ci_demo.ensure_pdf_exports())
@@ -1,6 +1,10 @@
-from unittest import TestCase
+import json
+import os
+import pickle
+import tempfile
+from unittest import TestCase, mock
 
-from hint import WorkshopHints, GITHUB, TextHint, ScreenshotHint, CodeHint, Hint
+from hint import WorkshopHints, GITHUB, TextHint, ScreenshotHint, CodeHint, Hint, load_catalogue, parse_catalogue
 
 
 class TestHint(TestCase):
@@ -28,14 +32,39 @@ class TestHint(TestCase):
         self.assertEqual(h.caption, expected_caption)
 
     def test_that_a_hint_can_be_a_code_hint(self):
-        expected_code = ["foo", "bar", "baz"]
-        h = CodeHint(1, expected_code)
+        expected_code = ("foo", "bar", "baz")
+        h = CodeHint(1, ["foo", "bar", "baz"])
         self.assertEqual(h.code, expected_code)
+        self.assertEqual(h.code_text, "foo\nbar\nbaz")
+
+    def test_that_a_code_hint_keeps_its_lines(self):
+        self.assertEqual((), CodeHint(1, []).code)
+        self.assertNotEqual(CodeHint(1, []), CodeHint(1, [""]))
 
     def test_that_the_hint_base_class_cannot_be_instantiated(self):
         with self.assertRaises(TypeError):
             Hint(1)
 
+    def test_that_a_hint_is_immutable(self):
+        h = TextHint(1, "foo")
+        with self.assertRaises(AttributeError):
+            h.text = "bar"
+        with self.assertRaises(AttributeError):
+            h.foo = "bar"
+
+    def test_that_a_hint_has_no_instance_dictionary(self):
+        for h in [TextHint(1, "foo"), ScreenshotHint(2, "foo.png", "bar"), CodeHint(3, ["foo"])]:
+            self.assertFalse(hasattr(h, "__dict__"))
+
+    def test_that_hints_with_the_same_values_are_equal(self):
+        self.assertEqual(CodeHint(1, ["foo"]), CodeHint(1, ("foo",)))
+        self.assertEqual(hash(CodeHint(1, ["foo"])), hash(CodeHint(1, ("foo",))))
+        self.assertNotEqual(TextHint(1, "foo"), TextHint(2, "foo"))
+
+    def test_that_a_hint_survives_pickling(self):
+        h = ScreenshotHint(1, "foo.png", "bar", "baz")
+        self.assertEqual(h, pickle.loads(pickle.dumps(h)))
+
 
 class TestWorkshopHints(TestCase):
     def test_that_getting_hints_for_an_unknown_step_returns_an_empty_list(self):
@@ -45,3 +74,77 @@ class TestWorkshopHints(TestCase):
     def test_that_getting_hints_for_an_known_step_returns_an_empty_list(self):
         h = WorkshopHints()
         self.assertNotEqual(0, len(h.get_hints_for_step(GITHUB)))
+
+    def test_that_the_default_catalogue_contains_all_hints(self):
+        h = WorkshopHints()
+        self.assertEqual(list(range(1, 34)), [hint.id for hint in h.get_all_hints()])
+
+
+class TestHintCatalogue(TestCase):
+    catalogue = {
+        "steps": {
+            "1": [{"id": 1, "type": "text", "text": "foo"}],
+            "2": [
+                {"id": 2, "type": "screenshot", "image": "foo.png", "alt": "bar"},
+                {"id": 3, "type": "code", "code": ["foo", "bar"]}
+            ]
+        }
+    }
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "foo.json")
+        with open(self.path, "w") as fh:
+            json.dump(self.catalogue, fh)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_that_a_catalogue_is_loaded_per_step(self):
+        hints = load_catalogue(self.path)
+        self.assertEqual([1], [h.id for h in hints[1]])
+        self.assertEqual([2, 3], [h.id for h in hints[2]])
+        self.assertEqual("", hints[2][0].caption)
+        self.assertEqual(("foo", "bar"), hints[2][1].code)
+
+    def test_that_a_loaded_catalogue_is_cached(self):
+        load_catalogue(self.path)
+        with mock.patch('hint.parse_catalogue') as m_parse:
+            hints = load_catalogue(self.path)
+            m_parse.assert_not_called()
+        self.assertEqual("foo", hints[1][0].text)
+
+    def test_that_a_changed_catalogue_invalidates_the_cache(self):
+        load_catalogue(self.path)
+        with open(self.path, "w") as fh:
+            json.dump({"steps": {"1": [{"id": 1, "type": "text", "text": "changed"}]}}, fh)
+        self.assertEqual("changed", load_catalogue(self.path)[1][0].text)
+
+    def test_that_changed_hint_classes_invalidate_the_cache(self):
+        load_catalogue(self.path)
+        with mock.patch('hint.HINT_MODULE_DIGEST', b'changed'), \
+                mock.patch('hint.parse_catalogue', wraps=parse_catalogue) as m_parse:
+            load_catalogue(self.path)
+            m_parse.assert_called_once()
+
+    def test_that_a_catalogue_can_be_selected_by_name(self):
+        with mock.patch('hint.CATALOGUE_DIR', self.directory.name):
+            h = WorkshopHints(catalogue="foo")
+        self.assertEqual(3, len(h.get_all_hints()))
+
+    def test_that_an_unknown_hint_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_catalogue(b'{"steps": {"1": [{"id": 1, "type": "video"}]}}')
+
+    def test_that_a_hint_with_missing_fields_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_catalogue(b'{"steps": {"1": [{"id": 1, "type": "screenshot", "image": "foo.png"}]}}')
+
+    def test_that_a_hint_with_unknown_fields_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_catalogue(b'{"steps": {"1": [{"id": 1, "type": "text", "text": "foo", "bar": "baz"}]}}')
+
+    def test_that_duplicate_hint_ids_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_catalogue(b'{"steps": {"1": [{"id": 1, "type": "text", "text": "foo"}], '
+                            b'"2": [{"id": 1, "type": "text", "text": "bar"}]}}')
@@ -1,10 +1,16 @@
+import json
+import os
+import tempfile
 from random import randint
 
 import mock
-from jinja2 import Template
+from jinja2 import FileSystemBytecodeCache, Template
+from sqlalchemy.orm.attributes import set_committed_value
 
-from ci_demo import get_valid_step, User, retrieve_next_hint, get_active_hints, UserHints, db, \
-    unlock_all_hints_for_step, get_rendered_block_content
+from ci_demo import get_valid_step, workshop_steps, User, retrieve_next_hint, get_active_hints, UserHints, db, \
+    unlock_all_hints_for_step, get_rendered_block_content, get_workshop_content, get_pdf_name, Workshop, \
+    WorkshopContent, workshop_contents, DEFAULT_WORKSHOP, run_cpu_bound, app, precompile_templates, map_cpu_bound, \
+    get_pdf_sections, build_pdf, load_workshop_contents, take_next_hint, pdf_paths
 from hint import WorkshopHints, TextHint
 from tests.base import BaseTestCase
 
@@ -52,6 +58,22 @@ class TestMethods(BaseTestCase):
         user = User()
         self.assertEqual(expected, retrieve_next_hint(user, 1, hints))
 
+    def test_take_next_hint_stores_the_hint_as_taken(self):
+        u = self.create_user()
+        hint = TextHint(1, "foo")
+        self.assertEqual(hint, take_next_hint(u, 1, WorkshopHints({1: [hint]})))
+        self.assertIsNotNone(UserHints.query.filter(UserHints.user_id == u.id, UserHints.id == hint.id).first())
+
+    def test_take_next_hint_skips_a_hint_taken_in_another_session(self):
+        u = self.create_user()
+        db.session.add(UserHints(id=1, user_id=u.id))
+        db.session.commit()
+        # The hints of the user as they were loaded before the other session took the first hint
+        set_committed_value(u, 'hints', [])
+        expected = TextHint(2, "bar")
+        self.assertEqual(expected, take_next_hint(u, 1, WorkshopHints({1: [TextHint(1, "foo"), expected]})))
+        self.assertListEqual([1, 2], sorted(hint.id for hint in u.hints))
+
     def test_unlock_all_hints_for_step_unlocks_all_hints_for_the_user(self):
         u = self.create_user()
         hint = TextHint(1, "activated")
@@ -71,3 +93,125 @@ class TestMethods(BaseTestCase):
         with mock.patch('ci_demo.app.jinja_env.get_template') as m_get:
             m_get.return_value = Template(template_content)
             self.assertEqual(expected, get_rendered_block_content("foo"))
+
+    def test_get_workshop_content_returns_the_default_content_without_a_workshop(self):
+        self.assertEqual(workshop_contents[DEFAULT_WORKSHOP], get_workshop_content(None))
+
+    def test_get_workshop_content_returns_the_content_of_the_workshop(self):
+        content = WorkshopContent("foo", ["workshop_github.html"], WorkshopHints({1: [TextHint(1, "foo")]}))
+        with mock.patch.dict(workshop_contents, {"foo": content}):
+            self.assertEqual(content, get_workshop_content(Workshop(name="bar", content="foo")))
+
+    def test_load_workshop_contents_takes_the_steps_from_every_catalogue(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch('hint.CATALOGUE_DIR', directory):
+            with open(os.path.join(directory, "short.json"), "w") as fh:
+                json.dump({"templates": ["workshop_final.html"], "steps": {"1": []}}, fh)
+            contents = load_workshop_contents()
+        self.assertListEqual(["workshop_final.html"], contents["short"].steps)
+        self.assertEqual(workshop_contents[DEFAULT_WORKSHOP], contents[DEFAULT_WORKSHOP])
+
+    def test_workshops_with_different_contents_show_different_steps(self):
+        short = WorkshopContent("short", ["workshop_final.html"], WorkshopHints({1: [TextHint(1, "foo")]}))
+        db.session.add(Workshop(id=1, name="short", content="short"))
+        db.session.add(User(id=2, name="short", password="x", workshop_id=1))
+        db.session.commit()
+        self.create_user()
+        steps = {}
+        with mock.patch.dict(workshop_contents, {"short": short}):
+            for user_id in (1, 2):
+                with self.app.test_client() as c:
+                    with c.session_transaction() as session:
+                        session['user_id'] = user_id
+                    steps[user_id] = c.get('/my_workshop', headers={'Accept': 'application/json'}).json
+        self.assertEqual(len(workshop_steps), steps[1]['max_step'])
+        self.assertEqual(1, steps[2]['max_step'])
+        self.assertNotEqual(steps[1]['content'], steps[2]['content'])
+
+    def test_get_workshop_content_returns_the_default_content_for_unknown_content(self):
+        self.assertEqual(workshop_contents[DEFAULT_WORKSHOP], get_workshop_content(Workshop(name="bar", content="foo")))
+
+    def test_get_pdf_name_is_unique_per_content(self):
+        self.assertEqual("workshop.pdf", get_pdf_name(workshop_contents[DEFAULT_WORKSHOP]))
+        self.assertEqual("workshop_foo.pdf", get_pdf_name(WorkshopContent("foo", [], WorkshopHints({}))))
+
+    def test_get_pdf_name_is_unique_per_step(self):
+        self.assertEqual("workshop_step2.pdf", get_pdf_name(workshop_contents[DEFAULT_WORKSHOP], 2))
+        self.assertEqual("workshop_foo_step2.pdf", get_pdf_name(WorkshopContent("foo", [], WorkshopHints({})), 2))
+
+    def test_get_pdf_sections_returns_a_section_per_step(self):
+        content = workshop_contents[DEFAULT_WORKSHOP]
+        with app.test_request_context():
+            names = [name for name, _ in get_pdf_sections(content)]
+        self.assertListEqual(
+            ["about", "goal"] + ["step{nr}".format(nr=nr) for nr in range(1, len(content.steps) + 1)] + ["hints"], names
+        )
+
+    def test_get_pdf_sections_of_a_step_only_holds_its_hints(self):
+        content = WorkshopContent("foo", workshop_steps, WorkshopHints({2: [TextHint(1, "hint of step two")]}))
+        with app.test_request_context():
+            sections = get_pdf_sections(content, 2)
+            self.assertListEqual(["step2", "hints2"], [name for name, _ in sections])
+            self.assertIn("hint of step two", sections[1][1])
+            self.assertListEqual(["step3"], [name for name, _ in get_pdf_sections(content, 3)])
+
+    def test_build_pdf_only_renders_the_sections_that_changed(self):
+        content = workshop_contents[DEFAULT_WORKSHOP]
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(app.config, {'PDF_CACHE_DIR': cache_dir}), \
+                app.test_request_context():
+            pdf_path = build_pdf(content)
+            self.assertIsNotNone(pdf_path)
+            with mock.patch('ci_demo.get_pdf_sections') as m_sections:
+                self.assertEqual(pdf_path, build_pdf(content))
+                m_sections.assert_not_called()
+            parts = set(os.listdir(cache_dir))
+
+            sections = get_pdf_sections(content)
+            sections[2] = ("step1", sections[2][1].replace("</body>", "<p>changed</p></body>"))
+            # As in a new process, after the templates changed
+            pdf_paths.clear()
+            with mock.patch('ci_demo.get_pdf_sections', return_value=sections), \
+                    mock.patch('ci_demo.map_cpu_bound', wraps=map_cpu_bound) as m_map:
+                self.assertNotEqual(pdf_path, build_pdf(content))
+                self.assertEqual(1, len(m_map.call_args[0][1]))
+            # The changed section and the merged export replace their older versions
+            self.assertEqual(2, len(set(os.listdir(cache_dir)) - parts))
+            self.assertEqual(len(parts), len(os.listdir(cache_dir)))
+
+    def test_build_pdf_does_not_retry_a_failed_render_during_the_back_off(self):
+        content = workshop_contents[DEFAULT_WORKSHOP]
+        with tempfile.TemporaryDirectory() as cache_dir, app.test_request_context(), \
+                mock.patch.dict(app.config, {'PDF_CACHE_DIR': cache_dir, 'PDF_FAILURE_BACKOFF': 60}), \
+                mock.patch('ci_demo.map_cpu_bound', return_value=[False]) as m_map:
+            self.assertIsNone(build_pdf(content))
+            self.assertIsNone(build_pdf(content))
+            m_map.assert_called_once()
+
+            app.config['PDF_FAILURE_BACKOFF'] = 0
+            self.assertIsNone(build_pdf(content))
+            self.assertEqual(2, m_map.call_count)
+
+    def test_map_cpu_bound_runs_the_work_inline_without_cpu_workers(self):
+        with mock.patch('ci_demo.ProcessPoolExecutor') as m_pool:
+            self.assertListEqual([3, 4], map_cpu_bound(max, [1, 4], [3, 2]))
+            m_pool.assert_not_called()
+
+    def test_run_cpu_bound_runs_the_work_inline_without_cpu_workers(self):
+        with mock.patch('ci_demo.ProcessPoolExecutor') as m_pool:
+            self.assertEqual(3, run_cpu_bound(max, 1, 3))
+            m_pool.assert_not_called()
+
+    def test_run_cpu_bound_uses_a_process_pool_with_cpu_workers(self):
+        with mock.patch('ci_demo.ProcessPoolExecutor') as m_pool, mock.patch('ci_demo.cpu_executor', None), \
+                mock.patch.dict(app.config, {'CPU_WORKERS': 2}):
+            m_pool.return_value.submit.return_value.result.return_value = 3
+            self.assertEqual(3, run_cpu_bound(max, 1, 3))
+            m_pool.assert_called_once_with(max_workers=2)
+            m_pool.return_value.submit.assert_called_once_with(max, 1, 3)
+
+    def test_precompile_templates_stores_all_templates_in_the_bytecode_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                mock.patch.object(app.jinja_env, 'bytecode_cache', FileSystemBytecodeCache(cache_dir)):
+            app.jinja_env.cache.clear()
+            count = precompile_templates()
+            self.assertEqual(len(app.jinja_env.list_templates()), count)
+            self.assertEqual(count, len(os.listdir(cache_dir)))
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from ci_demo import app, db
+
+
+class TestMigrations(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.directory.name, 'migrations.db'))
+        self.ctx = app.app_context()
+        self.ctx.push()
+        self.default_engine = db.engines[None]
+        db.engines[None] = self.engine
+
+    def tearDown(self):
+        db.engines[None] = self.default_engine
+        self.ctx.pop()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_that_the_migrations_result_in_the_schema_of_the_models(self):
+        upgrade(directory=os.path.join(app.root_path, 'migrations'))
+        with self.engine.connect() as connection:
+            self.assertEqual([], compare_metadata(MigrationContext.configure(connection), db.metadata))
+
+    def test_that_the_primary_key_of_user_hints_leads_with_the_user(self):
+        upgrade(directory=os.path.join(app.root_path, 'migrations'))
+        inspector = inspect(self.engine)
+        self.assertEqual(['user_id', 'id'], inspector.get_pk_constraint('user_hints')['constrained_columns'])
+        self.assertEqual([], inspector.get_unique_constraints('user_hints'))
+
+    def test_that_all_migrations_can_be_reverted(self):
+        directory = os.path.join(app.root_path, 'migrations')
+        upgrade(directory=directory)
+        downgrade(directory=directory, revision='base')
+        self.assertEqual(['alembic_version'], inspect(self.engine).get_table_names())
+
+    def test_that_names_in_the_default_workshop_are_unique(self):
+        upgrade(directory=os.path.join(app.root_path, 'migrations'))
+        with self.engine.begin() as connection:
+            connection.execute(text("INSERT INTO workshop (id, name, content) VALUES (1, 'foo', 'ci_workshop')"))
+            connection.execute(text("INSERT INTO \"user\" (name, password, workshop_step) VALUES ('a', 'x', 1)"))
+            connection.execute(text("INSERT INTO \"user\" (name, password, workshop_step, workshop_id) "
+                                    "VALUES ('a', 'x', 1, 1)"))
+            with self.assertRaises(IntegrityError):
+                connection.execute(text("INSERT INTO \"user\" (name, password, workshop_step) VALUES ('a', 'x', 1)"))
@@ -0,0 +1,94 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, TestCase
+
+from pypdf import PdfReader
+
+from pdf import get_part_path, merge_pdfs, prune_parts, render_pdf, render_pdf_isolated, resolve_static_link
+
+HTML = "<html><body><h1>Step</h1><p>Some content</p></body></html>"
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+class TestPdf(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pdf_name = os.path.join(self.directory.name, 'part.pdf')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_that_an_isolated_render_writes_the_pdf(self):
+        with self.assertLogs('pdf', 'INFO') as logs:
+            self.assertTrue(render_pdf_isolated(HTML, self.pdf_name, memory_limit=0, timeout=60))
+        self.assertEqual(1, len(PdfReader(self.pdf_name).pages))
+        self.assertIn("peak memory", logs.output[0])
+        self.assertListEqual(['part.pdf'], os.listdir(self.directory.name))
+
+    def test_that_an_isolated_render_is_killed_after_the_timeout(self):
+        with self.assertLogs('pdf', 'WARNING') as logs:
+            self.assertFalse(render_pdf_isolated(HTML, self.pdf_name, memory_limit=0, timeout=0))
+        self.assertIn("took longer than", logs.output[0])
+        self.assertListEqual([], os.listdir(self.directory.name))
+
+    def test_that_an_isolated_render_is_killed_when_it_uses_too_much_memory(self):
+        with self.assertLogs('pdf', 'WARNING') as logs:
+            self.assertFalse(render_pdf_isolated(HTML, self.pdf_name, memory_limit=1, timeout=60))
+        self.assertIn("used more than 1 MiB", logs.output[0])
+        self.assertListEqual([], os.listdir(self.directory.name))
+
+    def test_that_an_isolated_render_after_the_deadline_is_not_started(self):
+        with self.assertLogs('pdf', 'WARNING') as logs, mock.patch('pdf.subprocess.Popen') as m_popen:
+            self.assertFalse(render_pdf_isolated(HTML, self.pdf_name, 0, 60, deadline=time.time() - 1))
+        m_popen.assert_not_called()
+        self.assertIn("deadline", logs.output[0])
+
+    def test_that_a_render_process_limits_its_own_cpu_time(self):
+        # Without the process that watches it, e.g. after gunicorn killed the worker
+        code = "import pdf; pdf.limit_resources(0, 0)\nwhile True: pass"
+        process = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(STATIC), timeout=30)
+        self.assertEqual(-signal.SIGXCPU, process.returncode)
+
+    def test_that_concurrent_isolated_renders_of_the_same_pdf_succeed(self):
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(lambda _: render_pdf_isolated(HTML, self.pdf_name, 0, 60), range(2)))
+        self.assertListEqual([True, True], results)
+        self.assertListEqual(['part.pdf'], os.listdir(self.directory.name))
+
+    def test_that_static_links_resolve_to_files(self):
+        self.assertEqual(os.path.join(STATIC, 'img', 'flow.png'),
+                         resolve_static_link('http://localhost/static/img/flow.png', None, STATIC))
+        self.assertEqual(os.path.join(STATIC, 'img', 'flow.png'), resolve_static_link('/static/img/flow.png', None, STATIC))
+        self.assertEqual('https://example.com/a.png', resolve_static_link('https://example.com/a.png', None, STATIC))
+        self.assertEqual('/static/../ci_demo.py', resolve_static_link('/static/../ci_demo.py', None, STATIC))
+
+    def test_that_images_are_read_from_the_static_folder(self):
+        html = '<html><body><img src="http://localhost/static/img/flow.png" /></body></html>'
+        self.assertTrue(render_pdf_isolated(html, self.pdf_name, 0, 60, static_folder=STATIC))
+        self.assertEqual(1, len(PdfReader(self.pdf_name).pages[0].images))
+
+    def test_that_merged_pdfs_are_numbered(self):
+        parts = []
+        for i in range(2):
+            parts.append(os.path.join(self.directory.name, 'part{i}.pdf'.format(i=i)))
+            self.assertTrue(render_pdf(HTML, parts[-1]))
+        merge_pdfs(parts, self.pdf_name, "Footer.")
+
+        pages = PdfReader(self.pdf_name).pages
+        self.assertEqual(2, len(pages))
+        self.assertIn("Footer. Page 2 of 2", pages[1].extract_text())
+
+    def test_that_pruning_removes_the_other_versions_of_a_part(self):
+        paths = [get_part_path(self.directory.name, name, html)
+                 for name, html in (('step1', 'old'), ('step1', 'new'), ('step10', 'old'), ('step1_hints', 'old'))]
+        for path in paths + [os.path.join(self.directory.name, 'step1.failed')]:
+            with open(path, 'w'):
+                pass
+        self.assertEqual(1, prune_parts(paths[1]))
+        self.assertListEqual(sorted([os.path.basename(path) for path in paths[1:]] + ['step1.failed']),
+                             sorted(os.listdir(self.directory.name)))
@@ -0,0 +1,85 @@
+import os
+import pstats
+import tempfile
+from unittest import TestCase, mock
+
+import flask
+from sqlalchemy import create_engine, text
+
+from profiling import PROFILING_HEADER, RequestProfiler, create_profiling_token
+
+
+class TestRequestProfiler(TestCase):
+    secret = 'secret'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite://')
+        # The first connection runs queries of its own
+        self.engine.connect().close()
+        self.app = flask.Flask(__name__)
+        self.profiler = RequestProfiler(self.directory.name, max_files=2, secret=self.secret)
+        self.profiler.init_app(self.app)
+
+        @self.app.route('/step')
+        def step():
+            flask.g.user = mock.Mock(workshop_step=3)
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 2"))
+            return "ok"
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def get_profiles(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def test_that_requests_without_a_token_are_not_profiled(self):
+        self.app.test_client().get('/step')
+        self.assertListEqual([], self.get_profiles())
+
+    def test_that_requests_with_an_invalid_token_are_not_profiled(self):
+        token = create_profiling_token('other secret')
+        self.app.test_client().get('/step', headers={PROFILING_HEADER: token})
+        self.assertListEqual([], self.get_profiles())
+
+    def test_that_tokens_are_ignored_without_a_secret(self):
+        profiler = RequestProfiler(self.directory.name)
+        with self.app.test_request_context('/step', headers={PROFILING_HEADER: create_profiling_token('')}):
+            self.assertFalse(profiler.should_profile(flask.request))
+
+    def test_that_requests_with_a_valid_token_are_profiled_and_tagged(self):
+        token = create_profiling_token(self.secret)
+        self.assertEqual(b"ok", self.app.test_client().get('/step', headers={PROFILING_HEADER: token}).data)
+        profile, = self.get_profiles()
+        self.assertRegex(profile, r'_step_step3_2q_\d+ms\.prof$')
+        pstats.Stats(os.path.join(self.directory.name, profile))
+
+    def test_that_sampled_requests_are_profiled(self):
+        self.profiler.sample_rate = 1.0
+        self.app.test_client().get('/step')
+        self.assertEqual(1, len(self.get_profiles()))
+
+    def test_that_only_the_newest_profiles_are_kept(self):
+        self.profiler.sample_rate = 1.0
+        client = self.app.test_client()
+        for i in range(4):
+            client.get('/step')
+            if i == 1:
+                oldest = self.get_profiles()
+        self.assertEqual(2, len(self.get_profiles()))
+        self.assertFalse(set(oldest) & set(self.get_profiles()))
+
+    def test_that_a_failing_request_releases_the_profiler(self):
+        self.profiler.sample_rate = 1.0
+
+        @self.app.route('/fail')
+        def fail():
+            raise ValueError("fail")
+
+        client = self.app.test_client()
+        self.assertEqual(500, client.get('/fail').status_code)
+        client.get('/step')
+        self.assertEqual(2, len(self.get_profiles()))
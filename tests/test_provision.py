@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+from ci_demo import User, UserHints, Workshop, db, verify_password, workshop_hints
+from provision import provision_users, read_users, seed
+from tests.base import BaseTestCase
+
+
+class TestProvision(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        fd, self.csv_path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.csv_path)
+        super().tearDown()
+
+    def write_csv(self, content: str) -> None:
+        with open(self.csv_path, 'w') as fh:
+            fh.write(content)
+
+    def test_read_users_skips_duplicate_names(self):
+        self.write_csv("name,password\nalice,one\nbob,two\nalice,three\n")
+        self.assertListEqual([('alice', 'one'), ('bob', 'two')], read_users(self.csv_path))
+
+    def test_read_users_rejects_rows_without_password(self):
+        self.write_csv("name,password\nalice,one\nbob,\n")
+        with self.assertRaisesRegex(ValueError, "line 3"):
+            read_users(self.csv_path)
+
+    def test_read_users_rejects_names_that_can_not_log_in(self):
+        self.write_csv("name,password\nalicealice1,one\n")
+        with self.assertRaisesRegex(ValueError, "longer than 10"):
+            read_users(self.csv_path)
+
+    def test_provision_users_creates_users_with_hashed_passwords(self):
+        self.write_csv("name,password\nalice,one\nbob,two\ncarol,three\n")
+        self.assertEqual(3, provision_users(self.csv_path, processes=1, batch_size=2))
+        alice = User.query.filter(User.name == 'alice').one()
+        self.assertEqual(1, alice.workshop_step)
+        self.assertIsNone(alice.workshop_id)
+        self.assertTrue(verify_password('one', alice.password))
+
+    def test_provision_users_skips_existing_users(self):
+        self.create_user()
+        self.write_csv("name,password\ntest,other\nalice,one\n")
+        self.assertEqual(1, provision_users(self.csv_path, processes=1))
+        self.assertTrue(verify_password(self.user_password, User.query.filter(User.name == 'test').one().password))
+
+    def test_provision_users_adds_users_to_the_given_workshop(self):
+        workshop = Workshop(name='other')
+        db.session.add(workshop)
+        db.session.commit()
+        self.create_user()
+        self.write_csv("name,password\ntest,other\n")
+        self.assertEqual(1, provision_users(self.csv_path, 'other', processes=1))
+        self.assertEqual(workshop.id, User.query.filter(User.name == 'test', User.workshop_id.isnot(None)).one().workshop_id)
+
+    def test_provision_users_rejects_unknown_workshops(self):
+        self.write_csv("name,password\nalice,one\n")
+        with self.assertRaises(ValueError):
+            provision_users(self.csv_path, 'unknown', processes=1)
+
+    def test_seed_creates_users_with_the_hints_of_their_steps(self):
+        users, hints = seed(20, batch_size=7)
+        self.assertEqual(20, users)
+        self.assertEqual(hints, UserHints.query.count())
+        for user in User.query.filter(User.name.like('load%')):
+            unlocked = {hint.id for hint in UserHints.query.filter(UserHints.user_id == user.id)}
+            for step in range(1, user.workshop_step):
+                self.assertTrue({hint.id for hint in workshop_hints.get_hints_for_step(step)} <= unlocked)
+
+    def test_seed_skips_existing_users(self):
+        seed(5)
+        users, _ = seed(8)
+        self.assertEqual(3, users)
+        self.assertEqual(8, User.query.filter(User.name.like('load%')).count())
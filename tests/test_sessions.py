@@ -0,0 +1,149 @@
+from unittest import mock, TestCase
+
+import ci_demo
+from sessions import MemorySessionStore, ServerSideSessionInterface, create_session_interface
+from tests import base
+
+
+class TestMemorySessionStore(TestCase):
+    def test_that_a_stored_session_can_be_retrieved(self):
+        store = MemorySessionStore()
+        store.set("foo", "bar", 60)
+        self.assertEqual("bar", store.get("foo"))
+
+    def test_that_an_unknown_session_returns_none(self):
+        self.assertIsNone(MemorySessionStore().get("foo"))
+
+    def test_that_a_deleted_session_is_gone(self):
+        store = MemorySessionStore()
+        store.set("foo", "bar", 60)
+        store.delete("foo")
+        self.assertIsNone(store.get("foo"))
+
+    def test_that_an_expired_session_is_gone(self):
+        store = MemorySessionStore()
+        store.set("foo", "bar", -1)
+        self.assertIsNone(store.get("foo"))
+        self.assertEqual(0, len(store))
+
+    def test_that_the_least_recently_used_session_is_evicted(self):
+        store = MemorySessionStore(max_entries=2)
+        store.set("foo", "1", 60)
+        store.set("bar", "2", 60)
+        store.get("foo")
+        store.set("baz", "3", 60)
+        self.assertEqual("1", store.get("foo"))
+        self.assertIsNone(store.get("bar"))
+        self.assertEqual("3", store.get("baz"))
+
+
+class TestCreateSessionInterface(TestCase):
+    def test_that_cookie_sessions_keep_the_default_interface(self):
+        self.assertIsNone(create_session_interface("cookie"))
+
+    def test_that_a_memory_store_can_be_created(self):
+        interface = create_session_interface("memory", 5)
+        self.assertIsInstance(interface.store, MemorySessionStore)
+        self.assertEqual(5, interface.store.max_entries)
+
+    def test_that_an_unknown_store_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_session_interface("foo")
+
+
+class TestServerSideSessions(base.BaseTestCase):
+    render_templates = False
+
+    def setUp(self):
+        super().setUp()
+        self.store = MemorySessionStore()
+        self.default_interface = self.app.session_interface
+        self.app.session_interface = ServerSideSessionInterface(self.store)
+        self.app.config['SESSION_STORE'] = 'memory'
+
+    def tearDown(self):
+        self.app.session_interface = self.default_interface
+        self.app.config['SESSION_STORE'] = 'cookie'
+        super().tearDown()
+
+    def test_that_only_the_session_id_is_stored_in_the_cookie(self):
+        with self.app.test_client() as c:
+            self.create_user_and_store_in_session(c)
+            c.get('/workshop')
+            self.assertEqual(1, len(self.store))
+            cookie = c.get_cookie(self.app.config['SESSION_COOKIE_NAME'])
+            self.assertNotIn('user_id', cookie.value)
+            self.assertIn('user_id', self.store.get(cookie.value))
+
+    def test_that_the_user_is_taken_from_the_session_cache(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            c.get('/workshop')
+            with mock.patch.object(ci_demo.User, 'query') as m_query:
+                import flask
+                c.get('/workshop')
+                m_query.filter.assert_not_called()
+                self.assertEqual(u.id, flask.g.user.id)
+                self.assertEqual(u.workshop_step, flask.g.user.workshop_step)
+
+    def test_that_the_session_cache_follows_the_progress_of_the_user(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            self.set_workshop_step_for_user(u, 1)
+            c.get('/workshop')
+            c.post('/my_workshop', data={'next': True})
+            with c.session_transaction() as session:
+                self.assertEqual(2, session['cached_user']['workshop_step'])
+                self.assertEqual([h.id for h in ci_demo.workshop_hints.get_hints_for_step(1)],
+                                 session['cached_user']['hint_ids'])
+            self.assertEqual(2, self.create_user().workshop_step)
+
+    def test_that_the_session_cache_is_verified_after_its_time_to_live(self):
+        with self.app.test_client() as c:
+            self.create_user_and_store_in_session(c)
+            c.get('/workshop')
+            with mock.patch.dict(self.app.config, USER_CACHE_TTL=0), \
+                    mock.patch.object(ci_demo.User, 'query', wraps=ci_demo.User.query) as m_query:
+                c.get('/workshop')
+                m_query.filter.assert_called()
+
+    def test_that_hints_taken_in_another_session_are_skipped(self):
+        u = self.create_user()
+        self.set_workshop_step_for_user(u, 1)
+        # Two devices of the same user
+        c1, c2 = self.app.test_client(), self.app.test_client()
+        for c in (c1, c2):
+            self.store_user_id_in_session(c, u)
+            c.get('/workshop')
+        self.assertEqual(200, c1.post('/my_workshop/hint').status_code)
+        rv = c2.post('/my_workshop/hint')
+        self.assertEqual(200, rv.status_code)
+        self.assertFalse(rv.json['last'])
+        with c2.session_transaction() as session:
+            self.assertListEqual([1, 2], sorted(session['cached_user']['hint_ids']))
+
+    def test_that_a_removed_user_is_logged_out(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            c.get('/workshop')
+            ci_demo.db.session.delete(u)
+            ci_demo.db.session.commit()
+            rv = c.post('/my_workshop', data={'next': True})
+            self.assertEqual(302, rv.status_code)
+            self.assertIn('/login', rv.location)
+            with c.session_transaction() as session:
+                self.assertNotIn('user_id', session)
+                self.assertNotIn('cached_user', session)
+
+    def test_that_the_session_id_changes_on_login(self):
+        self.create_user()
+        with self.app.test_client() as c:
+            with c.session_transaction() as session:
+                session['foo'] = 'bar'
+            sid = c.get_cookie(self.app.config['SESSION_COOKIE_NAME']).value
+            c.post('/login', data={'name': self.user_name, 'password': self.user_password})
+            new_sid = c.get_cookie(self.app.config['SESSION_COOKIE_NAME']).value
+            self.assertNotEqual(sid, new_sid)
+            self.assertIsNone(self.store.get(sid))
+            self.assertIn('user_id', self.store.get(new_sid))
+            self.assertIn('foo', self.store.get(new_sid))
@@ -0,0 +1,71 @@
+import sys
+from unittest import TestCase, mock
+
+from throttling import LoginThrottle, MemoryRateLimitBackend, RedisRateLimitBackend, create_rate_limit_backend
+
+
+class TestMemoryRateLimitBackend(TestCase):
+    def test_that_attempts_are_limited_within_the_window(self):
+        backend = MemoryRateLimitBackend()
+        self.assertListEqual([True, True, False], [backend.hit('key', 2, 60) for _ in range(3)])
+        self.assertTrue(backend.hit('other key', 2, 60))
+
+    def test_that_attempts_leave_the_window(self):
+        backend = MemoryRateLimitBackend()
+        with mock.patch('time.monotonic', return_value=100):
+            self.assertTrue(backend.hit('key', 1, 60))
+            self.assertFalse(backend.hit('key', 1, 60))
+        with mock.patch('time.monotonic', return_value=159):
+            self.assertFalse(backend.hit('key', 1, 60))
+        with mock.patch('time.monotonic', return_value=160):
+            self.assertTrue(backend.hit('key', 1, 60))
+
+    def test_that_the_least_recently_used_keys_are_forgotten(self):
+        backend = MemoryRateLimitBackend(max_keys=2)
+        for key in ['a', 'b', 'c']:
+            self.assertTrue(backend.hit(key, 1, 60))
+        self.assertTrue(backend.hit('a', 1, 60))
+        self.assertFalse(backend.hit('c', 1, 60))
+
+    def test_that_clearing_forgets_all_attempts(self):
+        backend = MemoryRateLimitBackend()
+        self.assertTrue(backend.hit('key', 1, 60))
+        backend.clear()
+        self.assertTrue(backend.hit('key', 1, 60))
+
+
+class TestRedisRateLimitBackend(TestCase):
+    def test_that_clearing_only_removes_the_keys_of_the_backend(self):
+        with mock.patch.dict(sys.modules, redis=mock.MagicMock()):
+            backend = RedisRateLimitBackend('redis://localhost', prefix='throttle:')
+        backend.client.scan_iter.return_value = iter([b'throttle:ip:1.1.1.1', b'throttle:signup'])
+        backend.clear()
+        backend.client.scan_iter.assert_called_once_with(match='throttle:*')
+        backend.client.delete.assert_called_once_with(b'throttle:ip:1.1.1.1', b'throttle:signup')
+
+
+class TestLoginThrottle(TestCase):
+    def setUp(self):
+        self.throttle = LoginThrottle(MemoryRateLimitBackend(), window=60, ip_limit=3, name_limit=2, signup_limit=1)
+
+    def test_that_attempts_are_limited_per_name(self):
+        self.assertTrue(self.throttle.allow_attempt('1.1.1.1', 'test'))
+        self.assertTrue(self.throttle.allow_attempt('2.2.2.2', 'test'))
+        self.assertFalse(self.throttle.allow_attempt('3.3.3.3', 'test'))
+        self.assertTrue(self.throttle.allow_attempt('3.3.3.3', 'other'))
+        self.assertDictEqual({'name': 1}, self.throttle.rejected)
+
+    def test_that_attempts_are_limited_per_ip(self):
+        for name in ['a', 'b', 'c']:
+            self.assertTrue(self.throttle.allow_attempt('1.1.1.1', name))
+        self.assertFalse(self.throttle.allow_attempt('1.1.1.1', 'd'))
+        self.assertDictEqual({'ip': 1}, self.throttle.rejected)
+
+    def test_that_signups_are_limited(self):
+        self.assertTrue(self.throttle.allow_signup())
+        self.assertFalse(self.throttle.allow_signup())
+        self.assertDictEqual({'signup': 1}, self.throttle.rejected)
+
+    def test_that_unknown_backends_are_rejected(self):
+        with self.assertRaises(ValueError):
+            create_rate_limit_backend('foo')
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from flask.testing import FlaskClient
 from typing import Optional
@@ -12,6 +13,16 @@ class TestViewRendering(base.BaseTestCase):
     render_templates = False
     workshop_pdf = 'workshop.pdf'
 
+    def setUp(self):
+        super().setUp()
+        # Every test renders the parts of the PDF again, instead of using the ones of an earlier test. They are rendered in
+        # the test process, so the PDF library can be mocked.
+        self.pdf_cache_dir = tempfile.TemporaryDirectory()
+        self.pdf_cache_dir_patch = mock.patch.dict(
+            ci_demo.app.config, {'PDF_CACHE_DIR': self.pdf_cache_dir.name, 'PDF_SUBPROCESS': False}
+        )
+        self.pdf_cache_dir_patch.start()
+
     def assert_that_page_uses_the_right_template(self, url: str, expected_template: str,
                                                  client: Optional[FlaskClient] = None) -> None:
         if client is None:
@@ -62,23 +73,31 @@ class TestViewRendering(base.BaseTestCase):
 
     def test_that_the_pdf_download_serves_the_correct_file(self):
         file_content = b"foo bar baz"
-        with open(self.workshop_pdf, 'wb') as fh:
+        pdf_path = os.path.join(self.pdf_cache_dir.name, 'export.pdf')
+        with open(pdf_path, 'wb') as fh:
             fh.write(file_content)
 
-        with self.app.test_client() as c:
+        with mock.patch('ci_demo.build_pdf', return_value=pdf_path), self.app.test_client() as c:
             response = c.get("/download_pdf")
             self.assertEqual(file_content, response.data)
+            self.assertIn(self.workshop_pdf, response.headers['Content-Disposition'])
+            self.assertIn('no-cache', response.headers['Cache-Control'])
 
     def test_that_the_pdf_download_generates_a_pdf_when_none_is_present(self):
-        self.assertFalse(os.path.isfile(self.workshop_pdf))
         with self.app.test_client() as c:
             response = c.get("/download_pdf")
-            with open(self.workshop_pdf, "rb") as fh:
-                expected_content = fh.read()
-                self.assertEqual(expected_content, response.data)
+            self.assertTrue(response.data.startswith(b"%PDF"))
+            self.assertIn(self.workshop_pdf, response.headers['Content-Disposition'])
+
+    def test_that_the_pdf_download_follows_changes_of_the_content(self):
+        # Templates only change while the application runs when they are reloaded (in debug mode)
+        with mock.patch.object(self.app.jinja_env, 'auto_reload', True), self.app.test_client() as c:
+            with mock.patch('ci_demo.get_pdf_sections', return_value=[("step2", "<p>foo</p>")]):
+                before = c.get("/download_pdf/2").data
+            with mock.patch('ci_demo.get_pdf_sections', return_value=[("step2", "<p>changed</p>")]):
+                self.assertNotEqual(before, c.get("/download_pdf/2").data)
 
     def test_that_the_pdf_download_raises_a_400_error(self):
-        self.assertFalse(os.path.isfile(self.workshop_pdf))
         with mock.patch('xhtml2pdf.pisa.CreatePDF') as m_pdf:
             class MockError:
                 err = True
@@ -86,11 +105,21 @@ class TestViewRendering(base.BaseTestCase):
             with self.app.test_client() as c:
                 self.assert400(c.get("/download_pdf"))
 
+    def test_that_the_step_pdf_download_generates_a_pdf_of_the_step(self):
+        with self.app.test_client() as c:
+            response = c.get("/download_pdf/2")
+            self.assertTrue(response.data.startswith(b"%PDF"))
+            self.assertIn('workshop_step2.pdf', response.headers['Content-Disposition'])
+
+    def test_that_the_step_pdf_download_returns_a_404_for_unknown_steps(self):
+        with self.app.test_client() as c:
+            self.assert404(c.get("/download_pdf/0"))
+            self.assert404(c.get("/download_pdf/{step}".format(step=len(ci_demo.workshop_steps) + 1)))
+
     def tearDown(self):
-        try:
-            os.remove(self.workshop_pdf)
-        except FileNotFoundError:
-            pass
+        self.pdf_cache_dir_patch.stop()
+        self.pdf_cache_dir.cleanup()
+        super().tearDown()
 
 
 
@@ -0,0 +1,137 @@
+from unittest import mock, TestCase
+
+import ci_demo
+from tests import base
+from write_behind import WriteBehindBuffer
+
+
+class TestWriteBehindBuffer(TestCase):
+    def setUp(self):
+        self.flush = mock.MagicMock()
+        self.buffer = WriteBehindBuffer(self.flush, 3600, max_pending=3)
+
+    def tearDown(self):
+        self.buffer.stop()
+
+    def test_that_pending_writes_can_be_read(self):
+        self.buffer.put(1, "foo")
+        self.buffer.put(1, "bar")
+        self.assertEqual("bar", self.buffer.get(1))
+        self.assertIsNone(self.buffer.get(2))
+        self.flush.assert_not_called()
+
+    def test_that_only_the_latest_value_per_key_is_flushed(self):
+        self.buffer.put(1, "foo")
+        self.buffer.put(1, "bar")
+        self.buffer.put(2, "baz")
+        self.assertEqual(2, self.buffer.flush())
+        self.flush.assert_called_once_with({1: "bar", 2: "baz"})
+        self.assertIsNone(self.buffer.get(1))
+
+    def test_that_the_buffer_is_flushed_when_too_many_writes_are_pending(self):
+        for key in range(3):
+            self.buffer.put(key, "foo")
+        self.flush.assert_called_once_with({0: "foo", 1: "foo", 2: "foo"})
+
+    def test_that_a_failed_flush_keeps_the_values(self):
+        self.buffer.put(1, "foo")
+        self.flush.side_effect = RuntimeError()
+        with self.assertRaises(RuntimeError):
+            self.buffer.flush()
+        self.assertEqual("foo", self.buffer.get(1))
+        self.flush.side_effect = None
+        self.buffer.flush()
+        self.flush.assert_called_with({1: "foo"})
+
+    def test_that_no_flusher_runs_without_an_interval(self):
+        buffer = WriteBehindBuffer(self.flush, 0)
+        with mock.patch('threading.Thread') as m_thread:
+            buffer.put(1, "foo")
+        m_thread.assert_not_called()
+        buffer.stop()
+        self.flush.assert_called_once_with({1: "foo"})
+
+    def test_that_stopping_the_buffer_flushes_pending_writes(self):
+        self.buffer.put(1, "foo")
+        self.buffer.stop()
+        self.flush.assert_called_once_with({1: "foo"})
+
+
+class TestWorkshopStepWriteBehind(base.BaseTestCase):
+    render_templates = False
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['STEP_FLUSH_INTERVAL'] = 3600
+        self.buffer_patch = mock.patch('ci_demo.step_buffer', WriteBehindBuffer(ci_demo.flush_workshop_steps, 3600))
+        self.buffer_patch.start()
+
+    def tearDown(self):
+        self.app.config['STEP_FLUSH_INTERVAL'] = 0
+        ci_demo.step_buffer.stop()
+        self.buffer_patch.stop()
+        super().tearDown()
+
+    def test_that_a_step_change_is_written_in_a_batch(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            self.set_workshop_step_for_user(u, 1)
+
+            c.post('/my_workshop', data={'next': True})
+            ci_demo.db.session.expire_all()
+            self.assertEqual(1, self.create_user().workshop_step)
+            self.assertEqual(2, ci_demo.step_buffer.get(u.id)[0])
+
+            ci_demo.step_buffer.flush()
+            ci_demo.db.session.expire_all()
+            self.assertEqual(2, self.create_user().workshop_step)
+
+    def test_that_the_user_sees_the_latest_step_before_it_is_written(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            self.set_workshop_step_for_user(u, 1)
+
+            c.post('/my_workshop', data={'next': True})
+            c.post('/my_workshop', data={'next': True})
+            self.assertEqual(3, ci_demo.step_buffer.get(u.id)[0])
+            response = c.post('/my_workshop', data={'next': True}, headers={'Accept': 'application/json'})
+            self.assertEqual(4, response.json['current_step'])
+
+    def test_that_a_late_flush_does_not_overwrite_a_newer_step(self):
+        u = self.create_user()
+        self.set_workshop_step_for_user(u, 1)
+        # Another worker stored a newer step in the meantime
+        u.workshop_step = 3
+        u.step_version = 2
+        ci_demo.db.session.commit()
+
+        ci_demo.flush_workshop_steps({u.id: (2, 1)})
+        ci_demo.db.session.expire_all()
+        self.assertEqual(3, self.create_user().workshop_step)
+
+    def test_that_a_login_does_not_skip_a_pending_step(self):
+        with self.app.test_client() as c:
+            u = self.create_user_and_store_in_session(c)
+            self.set_workshop_step_for_user(u, 1)
+            c.post('/my_workshop', data={'next': True})
+            c.post('/login', data={'name': self.user_name, 'password': self.user_password})
+
+            ci_demo.step_buffer.flush()
+            ci_demo.db.session.expire_all()
+            self.assertEqual(2, self.create_user().workshop_step)
+
+    def test_that_a_step_change_starts_from_the_step_in_the_session_cache(self):
+        self.app.config['SESSION_STORE'] = 'memory'
+        try:
+            with self.app.test_client() as c:
+                u = self.create_user_and_store_in_session(c)
+                self.set_workshop_step_for_user(u, 1)
+                with c.session_transaction() as session:
+                    # As if another worker moved the user to step 3 without writing it yet
+                    session['cached_user'] = dict(
+                        id=u.id, name=u.name, workshop_step=3, step_version=2, workshop_id=None, hint_ids=[], workshop=None
+                    )
+                response = c.post('/my_workshop', data={'next': True}, headers={'Accept': 'application/json'})
+                self.assertEqual(4, response.json['current_step'])
+        finally:
+            self.app.config['SESSION_STORE'] = 'cookie'
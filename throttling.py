@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Optional
+
+
+class RateLimitBackend(ABC):
+    """
+    Counts attempts per key in a sliding window.
+    """
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        """
+        Records an attempt, unless the limit was already reached.
+
+        :param key: What is limited, e.g. an IP address.
+        :param limit: The maximum number of attempts within the window.
+        :param window: The length of the window in seconds.
+        :return: True if the attempt is allowed.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Forgets all attempts.
+        """
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Keeps the attempts in the memory of the process, forgetting the least recently used keys when full. Every process
+    has its own limits.
+    """
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self.__attempts = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.monotonic()
+        with self.__lock:
+            attempts = self.__attempts.get(key)
+            if attempts is None:
+                attempts = self.__attempts[key] = deque()
+            self.__attempts.move_to_end(key)
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            allowed = len(attempts) < limit
+            if allowed:
+                attempts.append(now)
+            while len(self.__attempts) > self.max_keys:
+                self.__attempts.popitem(last=False)
+            return allowed
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__attempts.clear()
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Keeps the attempts in Redis, so the limits are shared between dynos. Requires the redis package.
+    """
+    # Counting and recording an attempt happen in one script, which Redis runs atomically; otherwise concurrent
+    # attempts could all see a count below the limit and all be let through.
+    HIT_SCRIPT = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1] - ARGV[2])
+        if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+            return 0
+        end
+        redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        return 1
+    """
+
+    def __init__(self, url: str, prefix: str = "throttle:") -> None:
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.__hit = self.client.register_script(self.HIT_SCRIPT)
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        return self.__hit(
+            keys=[self.prefix + key], args=[time.time(), window, limit, uuid.uuid4().hex, int(window) + 1]
+        ) == 1
+
+    def clear(self) -> None:
+        # SCAN instead of KEYS, so a large number of keys doesn't block Redis
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class LoginThrottle:
+    """
+    Limits login attempts per IP address and per user name, and the number of new accounts, before any password is
+    hashed or the database is queried. Rejected attempts are not recorded, so a client is let through again once its
+    earlier attempts leave the window.
+    """
+    def __init__(self, backend: RateLimitBackend, window: float = 60, ip_limit: int = 300, name_limit: int = 5,
+                 signup_limit: int = 100) -> None:
+        self.backend = backend
+        self.window = window
+        self.ip_limit = ip_limit
+        self.name_limit = name_limit
+        self.signup_limit = signup_limit
+        self.__rejected = Counter()
+        self.__lock = threading.Lock()
+
+    def allow_attempt(self, ip: str, name: str) -> bool:
+        """
+        Checks if a login attempt may be processed.
+
+        :param ip: The IP address of the client.
+        :param name: The name of the user, including what makes it unique (e.g. the workshop).
+        :return: True if the attempt is allowed.
+        """
+        if not self.backend.hit("ip:" + ip, self.ip_limit, self.window):
+            self._reject("ip")
+            return False
+        if not self.backend.hit("name:" + name, self.name_limit, self.window):
+            self._reject("name")
+            return False
+        return True
+
+    def allow_signup(self) -> bool:
+        """
+        Checks if a new account may be created.
+
+        :return: True if the signup is allowed.
+        """
+        if not self.backend.hit("signup", self.signup_limit, self.window):
+            self._reject("signup")
+            return False
+        return True
+
+    @property
+    def rejected(self) -> Dict[str, int]:
+        """
+        :return: The number of rejected attempts per reason (ip, name or signup).
+        """
+        with self.__lock:
+            return dict(self.__rejected)
+
+    def _reject(self, reason: str) -> None:
+        with self.__lock:
+            self.__rejected[reason] += 1
+
+
+def create_rate_limit_backend(kind: str, url: Optional[str] = None) -> RateLimitBackend:
+    """
+    Creates the configured kind of rate limit backend.
+
+    :param kind: "memory" or "redis".
+    :param url: The URL of the Redis server.
+    :return: The backend.
+    """
+    if kind == "memory":
+        return MemoryRateLimitBackend()
+    if kind == "redis":
+        return RedisRateLimitBackend(url)
+    raise ValueError("Unknown rate limit backend: {kind}".format(kind=kind))
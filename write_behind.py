@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Holds pending writes in memory (only the latest value per key) and hands them in batches to a flush function, every
+    interval seconds, when too many writes are pending, or when the buffer is stopped. Reads should go through the
+    buffer, so callers see their own writes before they are flushed. An interval of 0 (or less) disables the periodic
+    flush.
+    """
+    def __init__(self, flush: Callable[[Dict[Hashable, Any]], None], interval: float, max_pending: int = 500) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+        self.__flush = flush
+        self.__pending = {}
+        self.__flushing = {}
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.__pid = None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Queues a write.
+
+        :param key: The key to write.
+        :param value: The new value.
+        """
+        with self.__lock:
+            self.__pending[key] = value
+            full = len(self.__pending) >= self.max_pending
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Retrieves the value of a write that was not yet stored.
+
+        :param key: The key to look up.
+        :param default: The value to return if there is no pending write for the key.
+        :return: The pending value, or the default.
+        """
+        with self.__lock:
+            if key in self.__pending:
+                return self.__pending[key]
+            return self.__flushing.get(key, default)
+
+    def flush(self) -> int:
+        """
+        Writes all pending values. If the flush fails, the values are kept for the next attempt.
+
+        :return: The number of written values.
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                batch = self.__flushing = self.__pending
+                self.__pending = {}
+            if not batch:
+                return 0
+            try:
+                self.__flush(batch)
+            except Exception:
+                with self.__lock:
+                    for key, value in batch.items():
+                        self.__pending.setdefault(key, value)
+                raise
+            finally:
+                with self.__lock:
+                    self.__flushing = {}
+            return len(batch)
+
+    def stop(self) -> None:
+        """
+        Stops the periodic flushing and writes everything that is still pending.
+        """
+        self.__stopped.set()
+        self.flush()
+
+    def _ensure_flusher(self) -> None:
+        """
+        Starts the background flusher if it is not running in this process (e.g. after gunicorn forked a worker).
+        """
+        if self.__pid == os.getpid() or self.__stopped.is_set() or self.interval <= 0:
+            # Waiting for 0 seconds would make the flusher spin
+            return
+        with self.__lock:
+            if self.__pid == os.getpid():
+                return
+            self.__pid = os.getpid()
+            self.__thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self.__thread.start()
+
+    def _run(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush the write-behind buffer, will retry")